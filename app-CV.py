@@ -1,23 +1,42 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
-import re
 import base64
 import requests
-from datetime import datetime
+
+import app_common
+import master_cache
+import excel_export
+import html_tables
+import master_diff
+import price_book
+import price_history
+import quotations
+import rerun_metrics
+import serving_backend
+import variant_search
 
 # --- Page Config ---
 st.set_page_config(page_title="Mahindra Docket Audit Tool - CV", page_icon="🚛", layout="centered" )
+rerun_metrics.begin_run()
 
 # --- Constants ---
-DATA_DIR = "Data/Discount_Cheker"
-FILE_PATTERN = r"CV Discount Check Master File (\d{2})\.(\d{2})\.(\d{4})\.xlsx"
+DATA_DIR = master_cache.CV_DATA_DIR
+FILE_PATTERN = master_cache.CV_FILE_PATTERN
 SHEET_NAME = "Sheet1"
 HEADER_ROW = 1
+SERVING_ENGINE = app_common.serving_engine()
+app_common.apply_cache_budget()
+app_common.start_lookup_api()
+app_common.start_github_sync()
+
+# --- Background Prewarm (once per server process) ---
+serving_backend.start_prewarm(SERVING_ENGINE)
+price_history.start_backfill()
 
-# --- Global Styling ---
-st.markdown("""
-<style>
+# --- Global Styling (all table styles included; sent compacted, once per full run) ---
+GLOBAL_CSS = """
 :root {
     --title-size: 40px;
     --subtitle-size: 24px;
@@ -48,24 +67,11 @@ h2 { font-size: var(--subtitle-size) !important; }
     min-height: 24px !important;
 }
 
-/* Adaptive color based on theme */
-[data-theme="light"] .stSelectbox div[data-baseweb="select"] > div {
-    color: black !important;
-    background-color: #f3f4f6 !important;
-}
-[data-theme="dark"] .stSelectbox div[data-baseweb="select"] > div {
-    color: white !important;
-    background-color: #333 !important;
-}
 .stSelectbox div[data-baseweb="select"] {
     align-items: center !important;
     height: 28px !important;
 }
 
-.stSelectbox [data-baseweb="option"]:hover {
-    background-color: #f0f0f0 !important;
-    font-weight: 600 !important;
-}
 /* Light mode styling */
 [data-theme="light"] .stSelectbox div[data-baseweb="select"] > div {
     color: black !important;
@@ -100,36 +106,25 @@ h2 { font-size: var(--subtitle-size) !important; }
 .iptable td { background-color: #fff3e0; padding: 4px 6px; text-align: left; color: black; }
 .iptable, .iptable th, .iptable td { border: 1px solid #000; }
 
-</style>
-""", unsafe_allow_html=True)
-
+/* Vehicle Pricing Table */
+.vtable { border-collapse: collapse; width: 100%; font-weight: bold; font-size: var(--table-font-size); }
+.vtable th { background-color: #004080; color: white; padding: 4px 6px; text-align: right; }
+.vtable td { background-color: #f0f4f8; padding: 4px 6px; text-align: right; color: black; }
+.vtable td:first-child, .vtable th:first-child { text-align: left; }
+.vtable, .vtable th, .vtable td { border: 1px solid #000; }
 
-# --- Admin Authentication ---
-def check_admin_password():
-    correct_password = st.secrets["auth"]["admin_password"]
-    if "admin_authenticated" not in st.session_state:
-        st.session_state["admin_authenticated"] = False
+/* Cartel Offer Table */
+.ctable { border-collapse: collapse; width: 100%; font-weight: bold; font-size: var(--table-font-size); }
+.ctable th { background-color: #2e7d32; color: white; padding: 4px 6px; text-align: right; }
+.ctable td { background-color: #e8f5e9; padding: 4px 6px; text-align: right; color: black; }
+.ctable td:first-child, .ctable th:first-child { text-align: left; }
+.ctable, .ctable th, .ctable td { border: 1px solid #000; }
+"""
+st.markdown(html_tables.style_block(GLOBAL_CSS), unsafe_allow_html=True)
 
-    if not st.session_state["admin_authenticated"]:
-        with st.sidebar.expander("🔐 Admin Login", expanded=False):
-            pwd = st.text_input("Enter admin password:", type="password", key="admin_pwd")
-            if st.button("Login", key="admin_login_btn"):
-                if pwd == correct_password:
-                    st.session_state["admin_authenticated"] = True
-                    st.rerun()
-                else:
-                    st.error("❌ Incorrect password.")
-        return False
-    return True
-
-def logout_admin():
-    if st.session_state.get("admin_authenticated", False):
-        if st.sidebar.button("🔓 Logout Admin"):
-            st.session_state["admin_authenticated"] = False
-            st.rerun()
 
 # --- GitHub Upload + Cleanup ---
-def upload_to_github(file_path, filename):
+def upload_to_github(file_bytes, filename):
     try:
         token = st.secrets["github"]["token"]
         username = st.secrets["github"]["username"]
@@ -143,8 +138,7 @@ def upload_to_github(file_path, filename):
         }
 
         github_file_path = f"{github_dir}/{filename}"
-        with open(file_path, "rb") as f:
-            content = base64.b64encode(f.read()).decode()
+        content = base64.b64encode(file_bytes).decode()
 
         url = f"https://api.github.com/repos/{username}/{repo}/contents/{github_file_path}"
         check = requests.get(url, headers=headers)
@@ -166,74 +160,37 @@ def upload_to_github(file_path, filename):
         st.sidebar.success(f"✅ Uploaded to GitHub: {filename}")
 
         # Cleanup old files
-        list_url = f"https://api.github.com/repos/{username}/{repo}/contents/{github_dir}"
-        files_resp = requests.get(list_url, headers=headers)
-        if files_resp.status_code != 200:
-            st.sidebar.warning("⚠️ Could not fetch file list from GitHub.")
-            return
-
-        files_data = files_resp.json()
-        excel_files = []
-        for item in files_data:
-            fname = item["name"]
-            match = re.match(FILE_PATTERN, fname)
-            if match:
-                try:
-                    day, month, year = match.groups()
-                    fdate = datetime.strptime(f"{day}.{month}.{year}", "%d.%m.%Y")
-                    excel_files.append((fname, fdate, item["sha"]))
-                except:
-                    continue
-
-        excel_files.sort(key=lambda x: x[1], reverse=True)
-        for fname, _, sha_to_delete in excel_files[5:]:
-            del_url = f"https://api.github.com/repos/{username}/{repo}/contents/{github_dir}/{fname}"
-            del_payload = {
-                "message": f"Auto-delete old Excel file: {fname}",
-                "sha": sha_to_delete,
-                "branch": branch
-            }
-            requests.delete(del_url, headers=headers, json=del_payload)
+        app_common.prune_github(github_dir, FILE_PATTERN)
 
     except Exception as e:
         st.sidebar.error(f"❌ GitHub Error: {str(e)}")
 
 # --- Upload Section (Admin Only) ---
-if check_admin_password():
+if app_common.check_admin_password():
     st.sidebar.header("📂 File Upload (Admin Only)")
     uploaded_file = st.sidebar.file_uploader("Upload New Excel File", type=["xlsx"])
-    if uploaded_file:
-        os.makedirs(DATA_DIR, exist_ok=True)
-        save_path = os.path.join(DATA_DIR, uploaded_file.name)
-        with open(save_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        upload_to_github(save_path, uploaded_file.name)
-        st.rerun()
-logout_admin()
+    if uploaded_file and st.session_state.get("ingested_upload") != uploaded_file.file_id:
+        st.session_state["ingested_upload"] = uploaded_file.file_id
+        content = uploaded_file.getbuffer()
+        try:
+            master_cache.ingest_upload(
+                "CV", uploaded_file.name, content, on_ingest=app_common.history_recorder("CV", content)
+            )
+        except Exception as e:
+            st.sidebar.error(f"❌ Could not read {uploaded_file.name}: {e}")
+        else:
+            # From the upload itself: an older-dated file may already be pruned locally
+            upload_to_github(content, uploaded_file.name)
+            st.rerun()
+    app_common.render_cache_panel()
+app_common.logout_admin()
 
 
 # --- Government Services (Sidebar Shortcuts) ---
-st.sidebar.markdown("---")
-st.sidebar.markdown("### 🗂️ Government Services")
-
-with st.sidebar:
-    st.link_button("🏦 BLP Gujarat - Application Status", "https://blp.gujarat.gov.in/appstatussearch.php")
-    st.link_button("🏢 Udyam Registration Verification", "https://udyamregistration.gov.in/Government-India/Ministry-MSME-registration.htm")
-    st.link_button("🧾 Aadhaar–PAN Link Status", "https://eportal.incometax.gov.in/iec/foservices/#/pre-login/link-aadhaar-status")
+app_common.render_government_services()
 
 # --- File Listing ---
-def extract_date_from_filename(filename):
-    match = re.search(FILE_PATTERN, filename)
-    if match:
-        try:
-            day, month, year = match.groups()
-            return datetime.strptime(f"{day}.{month}.{year}", "%d.%m.%Y")
-        except:
-            return None
-    return None
-
-files = [(f, extract_date_from_filename(f)) for f in os.listdir(DATA_DIR) if re.match(FILE_PATTERN, f)]
-files = sorted([f for f in files if f[1]], key=lambda x: x[1], reverse=True)[:5]
+files = master_cache.list_recent_files("CV")
 if not files:
     st.error("❌ No valid Excel files found.")
     st.stop()
@@ -253,203 +210,353 @@ st.markdown(
 selected_file_label = st.selectbox("📅 Select Excel File", file_labels, key="main_excel_select")
 selected_filepath = os.path.join(DATA_DIR, file_map[selected_file_label])
 
-# --- Load Data ---
-data = pd.read_excel(selected_filepath, sheet_name=SHEET_NAME, header=HEADER_ROW)
-data.drop(data.columns[0], axis=1, inplace=True)
-data.columns = [str(col).strip().replace("\n", " ").replace("  ", " ") for col in data.columns]
-
-# --- Variant Dropdown with Reset ---
-current_variants = data["Variant"].dropna().drop_duplicates().tolist()
-if "selected_variant" not in st.session_state:
-    st.session_state.selected_variant = None
-
-if st.session_state.selected_variant not in current_variants:
-    st.session_state.selected_variant = current_variants[0] if current_variants else None
-
-selected_variant = st.selectbox(
-    "🎯 Select Vehicle Variant",
-    current_variants,
-    index=current_variants.index(st.session_state.selected_variant),
-    key="variant_selectbox"
-)
-st.session_state.selected_variant = selected_variant
-
-# --- Filter by Variant ---
-filtered = data[data["Variant"] == selected_variant]
-if filtered.empty:
-    st.warning("⚠️ No data found for selected variant.")
+# --- Load Data (shared cache, parsed once per file) ---
+try:
+    serving_backend.get_backend(selected_filepath, "CV", SERVING_ENGINE)
+except Exception as e:
+    st.error(f"❌ Could not read {file_map[selected_file_label]}: {e}")
     st.stop()
-row = filtered.iloc[0]
 
-# --- Currency Formatter ---
-def format_indian_currency(value):
-    try:
-        if pd.isnull(value) or value == 0:
-            return "₹0"
-        value = float(value)
-        is_negative = value < 0
-        value = abs(value)
-        s = f"{int(value)}"
-        last_three = s[-3:]
-        other = s[:-3]
-        if other:
-            other = re.sub(r'(\d)(?=(\d{2})+$)', r'\1,', other)
-            formatted = f"{other},{last_three}"
+if len(files) > 1 and st.toggle("🔁 Compare Files", key="compare_mode"):
+    cmp_old, cmp_new = st.columns(2)
+    with cmp_old:
+        old_label = st.selectbox("Older File", file_labels, index=1, key="compare_old")
+    with cmp_new:
+        new_label = st.selectbox("Newer File", file_labels, index=0, key="compare_new")
+    if old_label == new_label:
+        st.info("ℹ️ Pick two different files to compare.")
+    else:
+        try:
+            diff = master_cache.get_derived(
+                [(os.path.join(DATA_DIR, file_map[old_label]), "CV"), (os.path.join(DATA_DIR, file_map[new_label]), "CV")],
+                "diff",
+                master_diff.diff_cv,
+            )
+        except Exception as e:
+            st.error(f"❌ Could not compare these files: {e}")
         else:
-            formatted = last_three
-        result = f"₹{formatted}"
-        return f"-{result}" if is_negative else result
-    except:
-        return "Invalid"
-
-
-# --- Text Normalize ---
-def normalize_header_text(text):
-    if pd.isnull(text):
-        return ""
-    return " ".join(str(text).replace("\n", " ").split())
-
-# --- Selected Variant Title ---
-#st.markdown(f"<h2 style='margin-top: -8px; '> 🚚 {selected_variant}", unsafe_allow_html=True)
-
-# --- Pricing Table ---
-st.markdown("<h2 style='color:#e65100; margin-bottom: -8px;'>📝 Vehicle Pricing Details</h2>", unsafe_allow_html=True)
-
-# Modify columns: Remove "MAXI CARE"
-vehicle_cols = [
-    "Ex-Showroom Price", "TCS", "Comprehensive + Zero Dep. Insurance",
-    "R.T.O. Charges With Hypo.", "SMC Road - Tax (If Applicable)",
-    "RSA (Road Side Assistance) For 1 Year", "Accessories",
-    "ON ROAD PRICE With SMC Road Tax", "ON ROAD PRICE Without SMC Road Tax"
-]
-
-# Adjust ON ROAD PRICE values by subtracting MAXI CARE
-adjusted_row = row.copy()
-maxi_care_value = row.get("MAXI CARE", 0)
-if pd.notnull(maxi_care_value):
-    adjusted_row["ON ROAD PRICE With SMC Road Tax"] -= maxi_care_value
-    adjusted_row["ON ROAD PRICE Without SMC Road Tax"] -= maxi_care_value
-
-# Render pricing table
-pricing_html = """
-<style>
-.vtable { border-collapse: collapse; width: 100%; font-weight: bold; font-size: var(--table-font-size); }
-.vtable th { background-color: #004080; color: white; padding: 4px 6px; text-align: right; }
-.vtable td { background-color: #f0f4f8; padding: 4px 6px; text-align: right; color: black; }
-.vtable td:first-child, .vtable th:first-child { text-align: left; }
-.vtable, .vtable th, .vtable td { border: 1px solid #000; }
-</style>
-<table class='vtable'><tr><th>Description</th><th>Amount</th></tr>
-"""
-for col in vehicle_cols:
-    pricing_html += f"<tr><td>{col}</td><td>{format_indian_currency(adjusted_row[col])}</td></tr>"
-pricing_html += "</table>"
-st.markdown(pricing_html, unsafe_allow_html=True)
-
-#-----------------------------------------------------------------------------------------------------------------------------------------------------------------
-
-# --- Cartel Table (Excel-position accurate, dynamic end, correct row mapping) ---
-st.markdown(
-    "<h2 style='color:#e65100; margin-top: -10px; margin-bottom: -8px;'>🎁 Cartel Offer</h2>",
-    unsafe_allow_html=True
-)
-
-try:
-    raw_df = pd.read_excel(selected_filepath, sheet_name=SHEET_NAME, header=None)
-
-    CARTEL_START_COL = 12  # Column M (0-based)
+            app_common.render_diff(diff["Sheet1"])
+
+# --- Export (PDF quotations on a worker pool, Excel price book streamed; cached per file) ---
+PRICE_BOOK_FORMAT = "Full price book (Excel)"
+if st.toggle("📤 Export", key="export_mode"):
+    export_format = st.radio(
+        "Format",
+        ["One PDF per variant (zip)", "One combined PDF", PRICE_BOOK_FORMAT],
+        horizontal=True,
+        key="export_format",
+    )
+    if st.button("Generate Export", key="generate_export"):
+        with st.spinner("Preparing export..."):
+            try:
+                if export_format == PRICE_BOOK_FORMAT:
+                    book_path = excel_export.export_price_book(selected_filepath, "CV")
+                    export_name = os.path.splitext(os.path.basename(selected_filepath))[0] + " - Price Book.xlsx"
+                    export_mime = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    with open(book_path, "rb") as f:
+                        export_data = f.read()
+                else:
+                    export_name, export_data, export_mime = quotations.export_quotations(
+                        selected_filepath, "CV", combined=export_format == "One combined PDF"
+                    )
+            except Exception as e:
+                st.error(f"❌ Could not generate export: {e}")
+            else:
+                st.download_button(
+                    "⬇️ Download", export_data, file_name=export_name, mime=export_mime, on_click="ignore"
+                )
+
+# --- Formatting (shared with the exports) ---
+format_indian_currency = price_book.format_indian_currency
+POINT_ROW = "<tr><td style='text-align:center'>{}</td><td>{}</td></tr>".format
+
+def variant_index(filepath):
+    return master_cache.get_derived([(filepath, "CV")], "variant_index", variant_search.build_cv_index)
+
+
+# --- Cartel Matrix (all variants x all offers; built once per file, virtualized grid) ---
+def cartel_matrix(filepath):
+    return master_cache.get_derived([(filepath, "CV")], "cartel_matrix", price_book.cv_cartel_matrix)
+
+def matrix_column(label, group, values):
+    # Amount-only offers stay numeric so the grid sorts them; others show as in the variant view
+    if values.map(lambda v: pd.isnull(v) or pd.api.types.is_number(v)).all():
+        return values.astype(float).to_numpy(), st.column_config.NumberColumn(label, help=group, format="₹%,d")
+    text = values.map(lambda v: format_indian_currency(v) if pd.api.types.is_number(v) else v)
+    return text.to_numpy(), st.column_config.TextColumn(label, help=group)
+
+@st.fragment
+@rerun_metrics.measured
+def cartel_matrix_view():
+    if not st.toggle("🧮 Cartel Matrix (all variants)", key="cartel_matrix"):
+        return
+    matrix = cartel_matrix(selected_filepath)
+    if matrix.empty or not len(matrix.columns):
+        st.info("ℹ️ No cartel offers in this file.")
+        return
+
+    groups = matrix.columns.get_level_values(0).unique().tolist()
+    shown_groups = st.multiselect("Offer Groups", groups, default=groups, key="cartel_matrix_groups")
+    table = {"Model": matrix.index.get_level_values(0), "Variant": matrix.index.get_level_values(1)}
+    column_config = {
+        "Model": st.column_config.TextColumn("Model", pinned=True),
+        "Variant": st.column_config.TextColumn("Variant", pinned=True),
+    }
+    column_order = ["Model", "Variant"]
+    for i, (group, sub) in enumerate(matrix.columns):
+        key = f"offer_{i}"
+        table[key], column_config[key] = matrix_column(f"{group} · {sub}" if group else sub, group, matrix.iloc[:, i])
+        if group in shown_groups:
+            column_order.append(key)
+
+    st.caption(f"{len(matrix)} variants · {len(column_order) - 2} of {len(matrix.columns)} offers")
+    st.dataframe(
+        pd.DataFrame(table), hide_index=True, column_config=column_config, column_order=column_order
+    )
 
-    group_row = raw_df.iloc[0, CARTEL_START_COL:].ffill()
-    subheader_row = raw_df.iloc[1, CARTEL_START_COL:]
+cartel_matrix_view()
 
-    last_col = subheader_row.last_valid_index()
 
-    # Find Variant column dynamically
-    variant_col_idx = raw_df.iloc[1].tolist().index("Variant")
+# --- Net Price Ranking (on-road minus offers; precomputed per file, sorted by argsort) ---
+RANKING_PAGE_SIZE = 25
+RANKING_SORTS = {
+    "Net price: low to high": ("net", 1),
+    "Net price: high to low": ("net", -1),
+    "Total benefit: high to low": ("benefit", -1),
+    "On-road price: low to high": ("on_road", 1),
+}
 
-    variant_match = raw_df[raw_df.iloc[:, variant_col_idx] == selected_variant]
+def net_ranking(filepath):
+    return master_cache.get_derived([(filepath, "CV")], "net_ranking", price_book.cv_net_ranking)
+
+def clamp_state(key, low, high, default):
+    # Widget value kept inside bounds that move with the file and the offers counted
+    value = st.session_state.get(key, default)
+    if isinstance(value, tuple):
+        st.session_state[key] = tuple(min(max(v, low), high) for v in value)
+    else:
+        st.session_state[key] = min(max(value, low), high)
+
+@st.fragment
+@rerun_metrics.measured
+def net_ranking_view():
+    if not st.toggle("🏆 Net Price Ranking", key="net_ranking"):
+        return
+    ranking = net_ranking(selected_filepath)
+    if ranking.empty:
+        st.info("ℹ️ No variants in this file.")
+        return
+    on_road_col = price_book.CV_NET_ON_ROAD[price_book.CV_NET_PRICE_BASE]
+    groups = [col[len(price_book.CV_BENEFIT_PREFIX):] for col in ranking.columns if col.startswith(price_book.CV_BENEFIT_PREFIX)]
+
+    col1, col2 = st.columns(2)
+    with col1:
+        counted = st.multiselect(
+            "Offers Counted", groups, default=groups, key="ranking_groups",
+            help="VIN-year offers are alternatives: only the largest one counts.",
+        )
+    with col2:
+        query = st.text_input("Model / Variant contains", key="ranking_filter", placeholder="e.g. BLAZO")
+    sort_label = st.selectbox("Sort By", list(RANKING_SORTS), key="ranking_sort")
+
+    # All groups counted: the precomputed net price; otherwise one vectorized sum
+    counted_cols = [price_book.CV_BENEFIT_PREFIX + group for group in counted]
+    on_road = ranking[on_road_col].to_numpy(float)
+    if len(counted) == len(groups):
+        benefit = ranking[price_book.CV_TOTAL_BENEFIT].to_numpy(float)
+        net = ranking[price_book.CV_NET_PRICE].to_numpy(float)
+    else:
+        benefit = price_book.cv_total_benefit(ranking, counted_cols).to_numpy(float)
+        net = on_road - benefit
+
+    if np.isnan(net).all():
+        st.info("ℹ️ No on-road prices in this file.")
+        return
+    low, high = int(np.floor(np.nanmin(net))), int(np.ceil(np.nanmax(net)))
+    if low < high:
+        clamp_state("ranking_band", low, high, (low, high))
+        band = st.slider("Net Price Band (₹)", low, high, step=1000, key="ranking_band")
+    else:
+        band = (low, high)
+
+    mask = (net >= band[0]) & (net <= band[1])
+    if query:
+        haystack = ranking["Model"] + " " + ranking["Variant"].astype(str)
+        mask &= haystack.str.contains(query, case=False, regex=False).to_numpy()
+    rows = np.flatnonzero(mask)
+    column, direction = RANKING_SORTS[sort_label]
+    keys = {"net": net, "benefit": benefit, "on_road": on_road}[column][rows]
+    rows = rows[np.argsort(keys * direction, kind="stable")]
+
+    pages = max(1, -(-len(rows) // RANKING_PAGE_SIZE))
+    page = 1
+    if pages > 1:
+        clamp_state("ranking_page", 1, pages, 1)
+        page = st.number_input("Page", 1, pages, key="ranking_page")
+    shown = rows[(page - 1) * RANKING_PAGE_SIZE:page * RANKING_PAGE_SIZE]
+    st.caption(f"{len(rows)} of {len(ranking)} variants · page {page} of {pages}")
+
+    money = st.column_config.NumberColumn(format="₹%,d")
+    table = ranking.iloc[shown][["Model", "Variant", on_road_col] + counted_cols].assign(
+        **{"Offers": benefit[shown], "Net Price": net[shown]}
+    )
+    table.insert(0, "Rank", np.arange((page - 1) * RANKING_PAGE_SIZE + 1, (page - 1) * RANKING_PAGE_SIZE + len(shown) + 1))
+    st.dataframe(
+        table,
+        hide_index=True,
+        column_config={
+            on_road_col: st.column_config.NumberColumn("On Road Price", format="₹%,d"),
+            **{col: st.column_config.NumberColumn(col[len(price_book.CV_BENEFIT_PREFIX):], format="₹%,d") for col in counted_cols},
+            "Offers": money,
+            "Net Price": money,
+        },
+    )
 
-    if variant_match.empty:
-        st.warning("⚠️ Variant not found for Cartel table.")
-        st.stop()
+net_ranking_view()
+
+
+# --- Variant View (fragment: changing the variant reruns only this part) ---
+@st.fragment
+@rerun_metrics.measured
+def variant_view():
+    backend = serving_backend.get_backend(selected_filepath, "CV", SERVING_ENGINE)
+
+    # --- Variant Search (trigram index, built once per file) ---
+    search_query = st.text_input("🔎 Search Variant", key="variant_search", placeholder="e.g. BLAZO X 35")
+    search_matches = []
+    if search_query:
+        search_matches = [variant for variant, _ in variant_index(selected_filepath).search(search_query)]
+        other_hits = []
+        for label, (fname, dt) in zip(file_labels, files):
+            if label == selected_file_label:
+                continue
+            count = len(variant_index(os.path.join(DATA_DIR, fname)).search(search_query))
+            if count:
+                other_hits.append(f"{dt.strftime('%d-%b-%Y')} ({count})")
+        if not search_matches:
+            st.warning(f"⚠️ No variant matches \"{search_query}\" in this file.")
+        if other_hits:
+            st.caption("Also found in: " + ", ".join(other_hits))
+
+    # --- Variant Dropdown with Reset ---
+    current_variants = search_matches or backend.variants("CV")
+    if "cv_selected_variant" not in st.session_state:
+        st.session_state.cv_selected_variant = None
+
+    if st.session_state.cv_selected_variant not in current_variants:
+        st.session_state.cv_selected_variant = current_variants[0] if current_variants else None
+
+    selected_variant = st.selectbox(
+        "🎯 Select Vehicle Variant",
+        current_variants,
+        index=current_variants.index(st.session_state.cv_selected_variant),
+        key="variant_selectbox"
+    )
+    st.session_state.cv_selected_variant = selected_variant
+
+    # --- Filter by Variant ---
+    row = backend.row("CV", selected_variant)
+    if row is None:
+        st.warning("⚠️ No data found for selected variant.")
+        return
+
+    # --- Selected Variant Title ---
+    #st.markdown(f"<h2 style='margin-top: -8px; '> 🚚 {selected_variant}", unsafe_allow_html=True)
+
+    # --- Pricing Table ---
+    st.markdown("<h2 style='color:#e65100; margin-bottom: -8px;'>📝 Vehicle Pricing Details</h2>", unsafe_allow_html=True)
+
+    # Render pricing table (styles live in GLOBAL_CSS)
+    pricing_html = html_tables.table("vtable", [
+        html_tables.HEADER_2("Description", "Amount"),
+        # MAXI CARE is taken out of the on-road prices
+        *(html_tables.ROW_2(col, format_indian_currency(val)) for col, val in price_book.cv_pricing(row)),
+    ])
+    st.markdown(pricing_html, unsafe_allow_html=True)
+
+    # --- Price History (every uploaded file, not just the retained 5) ---
+    if st.toggle("📈 Price History", key="price_history"):
+        # Model Name is the raw grid's first column
+        model_row = backend.raw_row(selected_variant)
+        history_model = None
+        if model_row is not None:
+            history_model = price_history.base_model("" if pd.isnull(model_row.iloc[0]) else model_row.iloc[0])
+        history = price_history.variant_history("CV", selected_variant, history_model)
+        if history.empty:
+            st.info("ℹ️ No price history recorded for this variant yet.")
+        else:
+            history_fields = history["Field"].unique().tolist()
+            history_field = st.selectbox(
+                "Field",
+                history_fields,
+                index=history_fields.index("Ex-Showroom Price") if "Ex-Showroom Price" in history_fields else 0,
+                key="history_field",
+            )
+            series = history[history["Field"] == history_field]
+            if series["Value"].notna().any():
+                st.line_chart(series.set_index("Date")["Value"])
+            st.dataframe(
+                series.assign(
+                    Date=series["Date"].dt.strftime("%d-%b-%Y"),
+                    Value=[format_indian_currency(v) if pd.notnull(v) else t for v, t in zip(series["Value"], series["Text"])],
+                )[["Date", "Model", "Value"]],
+                hide_index=True,
+            )
 
-    cartel_data_row = variant_match.iloc[0]
+    #-----------------------------------------------------------------------------------------------------------------------------------------------------------------
 
-    cartel_html = (
-        "<style>"
-        ".ctable { border-collapse: collapse; width: 100%; font-weight: bold; font-size: var(--table-font-size); }"
-        ".ctable th { background-color: #2e7d32; color: white; padding: 4px 6px; text-align: right; }"
-        ".ctable td { background-color: #e8f5e9; padding: 4px 6px; text-align: right; color: black; }"
-        ".ctable td:first-child, .ctable th:first-child { text-align: left; }"
-        ".ctable, .ctable th, .ctable td { border: 1px solid #000; }"
-        "</style>"
-        "<table class='ctable'>"
+    # --- Cartel Table (Excel-position accurate, dynamic end, correct row mapping) ---
+    st.markdown(
+        "<h2 style='color:#e65100; margin-top: -10px; margin-bottom: -8px;'>🎁 Cartel Offer</h2>",
+        unsafe_allow_html=True
     )
 
-    current_group = None
-    group_has_rows = False
+    try:
+        header_row0, header_row1 = backend.cartel_headers()
 
-    for col_idx in range(CARTEL_START_COL, last_col + 1):
-        grp = group_row.iloc[col_idx - CARTEL_START_COL]
-        sub = normalize_header_text(subheader_row.iloc[col_idx - CARTEL_START_COL])
-        val = cartel_data_row.iloc[col_idx]
+        # Raw Sheet1 row of this variant (Variant column found dynamically)
+        cartel_data_row = backend.raw_row(selected_variant)
 
-        if grp != current_group:
-            group_has_rows = False
-            pending_group = grp
-            current_group = grp
+        if cartel_data_row is None:
+            st.warning("⚠️ Variant not found for Cartel table.")
+            return
 
-        if pd.isnull(val) or val == 0 or str(val).strip() == "":
-            continue
+        cartel_rows = []  # styles live in GLOBAL_CSS
+        for group, offers in price_book.cv_cartel(header_row0, header_row1, cartel_data_row):
+            cartel_rows.append(html_tables.GROUP_HEADER(group))
+            cartel_rows.append(html_tables.HEADER_2("Description", "Offer"))
+            for sub, val in offers:
+                if pd.api.types.is_number(val):
+                    val = format_indian_currency(val)
+                cartel_rows.append(html_tables.ROW_2(sub, val))
 
-        if not group_has_rows:
-            cartel_html += (
-                "<tr>"
-                f"<th colspan='2' class='cartel-group' style='background:#ffffff; text-align:left;'>{pending_group}</th>"
-                "</tr>"
-                "<tr><th>Description</th><th>Offer</th></tr>"
-            )
-            group_has_rows = True
+        st.markdown(html_tables.table("ctable", cartel_rows), unsafe_allow_html=True)
 
-        if pd.api.types.is_number(val):
-            val = format_indian_currency(val)
+    except Exception as e:
+        st.warning(f"⚠️ Could not load Cartel Offer data: {e}")
 
-        cartel_html += f"<tr><td>{sub}</td><td>{val}</td></tr>"
 
-    cartel_html += "</table>"
-    st.markdown(cartel_html, unsafe_allow_html=True)
+    # --- Important Points Table ---
+    try:
+        points_df = backend.points()  # ✅ Report!F6:G25 (Sr., Points)
 
-except Exception as e:
-    st.warning(f"⚠️ Could not load Cartel Offer data: {e}")
+        # Subtitle
+        st.markdown(
+            "<h2 style='color:#e65100; margin-top: -10px; margin-bottom: -8px;'>⭐ Important Points</h2>",
+            unsafe_allow_html=True
+        )
 
+        # Build HTML table (use global styling)
+        points_html = html_tables.table("iptable", [
+            html_tables.HEADER_2("Sr.", "Points"),
+            *(POINT_ROW(int(sr), point) for sr, point in zip(points_df["Sr."], points_df["Points"])),
+        ])
 
-# --- Important Points Table ---
-try:
-    points_df = pd.read_excel(
-        selected_filepath,
-        sheet_name="Report",
-        header=None,
-        usecols="F:G",   # ✅ F = Sr. , G = Points
-        skiprows=5,      # ✅ Skip first 5 rows (start from row 6)
-        nrows=20         # ✅ Max till row 25
-    ).dropna()
-
-    # Rename columns
-    points_df.columns = ["Sr.", "Points"]
-
-    # Subtitle
-    st.markdown(
-        "<h2 style='color:#e65100; margin-top: -10px; margin-bottom: -8px;'>⭐ Important Points</h2>",
-        unsafe_allow_html=True
-    )
+        st.markdown(points_html, unsafe_allow_html=True)
 
-    # Build HTML table (use global styling)
-    points_html = "<table class='iptable'><tr><th>Sr.</th><th>Points</th></tr>"
-    for _, row in points_df.iterrows():
-        points_html += f"<tr><td style='text-align:center'>{int(row['Sr.'])}</td><td>{row['Points']}</td></tr>"
-    points_html += "</table>"
+    except Exception as e:
+        st.warning(f"⚠️ Could not load Important Points: {e}")
 
-    st.markdown(points_html, unsafe_allow_html=True)
 
-except Exception as e:
-    st.warning(f"⚠️ Could not load Important Points: {e}")
+variant_view()
+rerun_metrics.end_run()
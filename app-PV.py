@@ -1,26 +1,47 @@
 import streamlit as st
 import pandas as pd
 import os
-import re
 import base64
 import requests
 from datetime import datetime
 
+import discount_map
+import app_common
+import master_cache
+import excel_export
+import html_tables
+import master_diff
+import price_book
+import price_history
+import quotations
+import rerun_metrics
+import serving_backend
+import what_if
+
 # --- Page Configuration ---
 st.set_page_config(
     page_title="Mahindra Vehicle Pricing Viewer",
-    page_icon="🚗"
+    page_icon="🚗",
     layout="centered",
     initial_sidebar_state="auto"
 )
+rerun_metrics.begin_run()
 
 # --- Constants ---
-DATA_DIR = "Data/Price_List"
-FILE_PATTERN = r"PV Price List Master D\. (\d{2})\.(\d{2})\.(\d{4})\.xlsx"
-
-# --- Global Styling ---
-st.markdown("""
-<style>
+DATA_DIR = master_cache.PV_DATA_DIR
+FILE_PATTERN = master_cache.PV_FILE_PATTERN
+SERVING_ENGINE = app_common.serving_engine()
+app_common.apply_cache_budget()
+app_common.start_lookup_api()
+app_common.start_github_sync()
+
+# --- Background Prewarm (once per server process) ---
+serving_backend.start_prewarm(SERVING_ENGINE)
+price_history.start_backfill()
+discount_map.start_prewarm()
+
+# --- Global Styling (all table styles included; sent compacted, once per full run) ---
+GLOBAL_CSS = """
 :root {
     --title-size: 40px;
     --subtitle-size: 20px;
@@ -83,47 +104,28 @@ h3 { font-size: var(--variant-title-size) !important; }
     .styled-table td { background-color: #111; color: #eee; }
     .styled-table td:first-child { background-color: #1e1e1e; color: white; }
 }
-</style>
-""", unsafe_allow_html=True)
-
-# --- Admin Auth ---
-def check_admin_password():
-    correct_password = st.secrets["auth"]["admin_password"]
-    if "admin_authenticated" not in st.session_state:
-        st.session_state["admin_authenticated"] = False
-
-    if not st.session_state["admin_authenticated"]:
-        with st.sidebar.expander("🔐 Admin Login", expanded=False):
-            pwd = st.text_input("Enter admin password:", type="password", key="admin_pwd")
-            if st.button("Login", key="admin_login_btn"):
-                if pwd == correct_password:
-                    st.session_state["admin_authenticated"] = True
-                    st.rerun()
-                else:
-                    st.error("❌ Incorrect password.")
-        return False
-    return True
-
-def logout_admin():
-    if st.session_state.get("admin_authenticated", False):
-        if st.sidebar.button("🔓 Logout Admin"):
-            st.session_state["admin_authenticated"] = False
-            st.rerun()
+.vtable { border-collapse: collapse; width: 100%; font-weight: bold; font-size: 14px; }
+.vtable th { background-color: #004080; color: white; padding: 4px 6px; text-align: center; }
+.vtable td { background-color: #f0f4f8; padding: 4px 6px; text-align: center; color: black; font-weight: bold }
+.vtable td:first-child, .vtable th:first-child { text-align: left; }
+.vtable, .vtable th, .vtable td { border: 1px solid #000; }
+"""
+st.markdown(html_tables.style_block(GLOBAL_CSS), unsafe_allow_html=True)
 
 # --- GitHub Upload Logic ---
-def upload_to_github(uploaded_file):
+def upload_to_github(uploaded_file, github_dir=DATA_DIR, filename=None, pattern=FILE_PATTERN):
     token = st.secrets["github"]["token"]
     username = st.secrets["github"]["username"]
     repo = st.secrets["github"]["repo"]
     branch = st.secrets["github"].get("branch", "main")
-    github_dir = DATA_DIR
+    filename = filename or uploaded_file.name
 
     headers = {
         "Authorization": f"Bearer {token}",
         "Accept": "application/vnd.github+json"
     }
 
-    github_path = f"{github_dir}/{uploaded_file.name}"
+    github_path = f"{github_dir}/{filename}"
     content = base64.b64encode(uploaded_file.getbuffer()).decode()
 
     url = f"https://api.github.com/repos/{username}/{repo}/contents/{github_path}"
@@ -131,7 +133,7 @@ def upload_to_github(uploaded_file):
     sha = check.json().get("sha") if check.status_code == 200 else None
 
     payload = {
-        "message": f"Upload {uploaded_file.name}",
+        "message": f"Upload {filename}",
         "content": content,
         "branch": branch
     }
@@ -141,26 +143,55 @@ def upload_to_github(uploaded_file):
     r = requests.put(url, headers=headers, json=payload)
     if r.status_code in [200, 201]:
         st.sidebar.success("✅ Uploaded successfully")
+        # Cleanup old files (same 5-file window as the local copy)
+        app_common.prune_github(github_dir, pattern)
     else:
         st.sidebar.error("❌ Upload failed")
 
 # --- Sidebar Upload ---
-if check_admin_password():
+if app_common.check_admin_password():
     st.sidebar.header("📂 File Upload (Admin Only)")
     file = st.sidebar.file_uploader("Upload New Excel File", type=["xlsx"])
-    if file:
-        upload_to_github(file)
-        st.rerun()
-logout_admin()
+    if file and st.session_state.get("ingested_upload") != file.file_id:
+        st.session_state["ingested_upload"] = file.file_id
+        content = file.getbuffer()
+        try:
+            save_path, removed = master_cache.ingest_upload(
+                "PV", file.name, content, on_ingest=app_common.history_recorder("PV", content)
+            )
+        except Exception as e:
+            st.sidebar.error(f"❌ Could not read {file.name}: {e}")
+        else:
+            if file.name not in removed:
+                try:
+                    discount_map.discount_map(save_path)
+                except Exception as e:
+                    st.sidebar.warning(f"⚠️ Discounts not matched: {e}")
+            upload_to_github(file)
+            st.rerun()
 
-# --- Government Services (Sidebar Shortcuts) ---
-st.sidebar.markdown("---")
-st.sidebar.markdown("### 🗂️ Government Services")
+    # --- Discount Remark Sheet (matched against every retained price list) ---
+    discount_file = st.sidebar.file_uploader("Upload Discount Remark Sheet", type=["xlsx"], key="discount_upload")
+    if discount_file and st.session_state.get("ingested_discounts") != discount_file.file_id:
+        st.session_state["ingested_discounts"] = discount_file.file_id
+        discount_name = discount_file.name
+        if not master_cache.extract_date_from_filename(discount_name, master_cache.DISCOUNT_FILE_PATTERN):
+            discount_name = f"PV Discount Remarks {datetime.now().strftime('%d.%m.%Y')}.xlsx"
+        try:
+            master_cache.ingest_upload("DISCOUNT", discount_name, discount_file.getbuffer())
+        except Exception as e:
+            st.sidebar.error(f"❌ Could not read {discount_file.name}: {e}")
+        else:
+            discount_map.warm_async()
+            upload_to_github(
+                discount_file, master_cache.DISCOUNT_DATA_DIR, discount_name, master_cache.DISCOUNT_FILE_PATTERN
+            )
+            st.rerun()
+    app_common.render_cache_panel()
+app_common.logout_admin()
 
-with st.sidebar:
-    st.link_button("🏦 BLP Gujarat - Application Status", "https://blp.gujarat.gov.in/appstatussearch.php")
-    st.link_button("🏢 Udyam Registration Verification", "https://udyamregistration.gov.in/Government-India/Ministry-MSME-registration.htm")
-    st.link_button("🧾 Aadhaar–PAN Link Status", "https://eportal.incometax.gov.in/iec/foservices/#/pre-login/link-aadhaar-status")
+# --- Government Services (Sidebar Shortcuts) ---
+app_common.render_government_services()
 
 
 # --- Title ---
@@ -171,23 +202,7 @@ st.markdown(
     unsafe_allow_html=True
 )
 # --- File Listing ---
-def extract_date_from_filename(filename):
-    match = re.match(FILE_PATTERN, filename)
-    if match:
-        try:
-            return datetime.strptime(".".join(match.groups()), "%d.%m.%Y")
-        except:
-            return None
-    return None
-
-def list_recent_files():
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
-    all_files = os.listdir(DATA_DIR)
-    valid = [(f, extract_date_from_filename(f)) for f in all_files if re.match(FILE_PATTERN, f)]
-    return sorted([f for f in valid if f[1]], key=lambda x: x[1], reverse=True)[:5]
-
-files = list_recent_files()
+files = master_cache.list_recent_files("PV")
 if not files:
     st.error("❌ No valid Excel files found")
     st.stop()
@@ -198,19 +213,57 @@ file_map = {label: name for label, (name, _) in zip(file_labels, files)}
 selected_label = st.selectbox("📅 Select Excel File", file_labels, key="main_excel_file")
 selected_path = os.path.join(DATA_DIR, file_map[selected_label])
 
-# --- Category Selection FIRST ---
-col1, col2 = st.columns([1, 3])
-with col1:
-    category = st.selectbox("🔍 Category", ["PV", "EV"], index=0)
-
-# --- Data Loader ---
-@st.cache_data(show_spinner=False)
-def load_data(file_path, sheet_name):
-    df = pd.read_excel(file_path, sheet_name=sheet_name)
-    df.columns = df.columns.str.strip()
-    return df
+# --- Load Data (shared cache; PV and EV are parsed together) ---
+try:
+    serving_backend.get_backend(selected_path, "PV", SERVING_ENGINE)
+except Exception as e:
+    st.error(f"❌ Could not read {file_map[selected_label]}: {e}")
+    st.stop()
 
-df = load_data(selected_path, sheet_name=category)
+# --- Export (PDF quotations on a worker pool, Excel price book streamed; cached per file) ---
+PRICE_BOOK_FORMAT = "Full price book (Excel)"
+if st.toggle("📤 Export", key="export_mode"):
+    export_format = st.radio(
+        "Format",
+        ["One PDF per variant (zip)", "One combined PDF", PRICE_BOOK_FORMAT],
+        horizontal=True,
+        key="export_format",
+    )
+    if st.button("Generate Export", key="generate_export"):
+        with st.spinner("Preparing export..."):
+            try:
+                if export_format == PRICE_BOOK_FORMAT:
+                    book_path = excel_export.export_price_book(selected_path, "PV")
+                    export_name = os.path.splitext(os.path.basename(selected_path))[0] + " - Price Book.xlsx"
+                    export_mime = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    with open(book_path, "rb") as f:
+                        export_data = f.read()
+                else:
+                    export_name, export_data, export_mime = quotations.export_quotations(
+                        selected_path, "PV", combined=export_format == "One combined PDF"
+                    )
+            except Exception as e:
+                st.error(f"❌ Could not generate export: {e}")
+            else:
+                st.download_button(
+                    "⬇️ Download", export_data, file_name=export_name, mime=export_mime, on_click="ignore"
+                )
+
+# --- Discount Rule Check (Admin Only): overlapping and missing rules ---
+if st.session_state.get("admin_authenticated") and discount_map.latest_discount_sheet():
+    if st.toggle("🧮 Discount Rule Check", key="discount_check"):
+        report = discount_map.overlap_report(selected_path)
+        uncovered = report["uncovered"]
+        st.caption(
+            f"{len(report['rules'])} rules · {len(report['conflicts'])} overlapping pairs · "
+            f"{len(uncovered)} of {len(report['counts'])} variants without a rule"
+        )
+        if len(report["conflicts"]):
+            st.markdown("**⚠️ Rules applying to the same variants**")
+            st.dataframe(report["conflicts"], hide_index=True)
+        if len(uncovered):
+            st.markdown("**🚫 Variants no rule covers**")
+            st.dataframe(uncovered, hide_index=True)
 
 # --- Dropdown State Logic ---
 def safe_selectbox(label, options, session_key):
@@ -219,107 +272,219 @@ def safe_selectbox(label, options, session_key):
         selected = options[0] if options else None
     return st.selectbox(label, options, index=options.index(selected) if selected in options else 0, key=session_key)
 
-# --- Dynamic Dropdowns ---
-models = sorted(df["Model"].dropna().unique())
-if not models:
-    st.error("❌ No models found")
-    st.stop()
+# --- Format Currency (shared with the exports) ---
+format_indian_currency = price_book.format_indian_currency
+
+# --- Table Renderer ---
+def render_combined_table(row, shared_fields, group_keys):
+    # Styles live in GLOBAL_CSS; rows are joined once
+    rows = [html_tables.HEADER_3("Description", "Individual", "Corporate")]
+    for field, ind_val, corp_val in price_book.pv_pricing(row, shared_fields, group_keys):
+        rows.append(html_tables.ROW_3(field, format_indian_currency(ind_val), format_indian_currency(corp_val)))
+    return html_tables.table("vtable", rows)
+
+
+def render_discount_table(discounts):
+    rows = [html_tables.HEADER_2("Remark", "Details")]
+    for entry in discounts:
+        details = " · ".join(
+            f"{col}: {format_indian_currency(val) if pd.api.types.is_number(val) else val}" for col, val in entry["Details"]
+        )
+        rows.append(html_tables.ROW_2(entry["Remark"], details))
+    return html_tables.table("vtable", rows)
+
+
+# --- What-If Calculator (fragment: whole catalog recomputed per change, in numpy) ---
+@st.fragment
+@rerun_metrics.measured
+def what_if_view():
+    if not st.toggle("🧮 What-If Calculator", key="whatif_mode"):
+        return
+    catalog = what_if.catalog(selected_path)
+    if catalog is None:
+        st.info("ℹ️ No sheet in this file has the on-road price columns.")
+        return
+    fastag_now = what_if.current_amount(catalog, "Fastag")
+    hypo_fee_now = what_if.current_hypo_fee(catalog)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        tcs_rate = st.slider("TCS rate (%)", 0.0, 5.0, what_if.TCS_RATE, 0.1, key="whatif_tcs_rate")
+        insurance_pct = st.slider("Insurance change (%)", -30.0, 30.0, 0.0, 0.5, key="whatif_insurance")
+        rto_individual = st.slider("RTO change, Individual (%)", -50.0, 50.0, 0.0, 0.5, key="whatif_rto_individual")
+        rto_corporate = st.slider("RTO change, Corporate (%)", -50.0, 50.0, 0.0, 0.5, key="whatif_rto_corporate")
+    with col2:
+        tcs_threshold = st.number_input(
+            "TCS above ex-showroom (₹)", 0, None, what_if.TCS_THRESHOLD, 50000, key="whatif_tcs_threshold"
+        )
+        hypo_fee = st.number_input("HYPO charge (₹)", 0.0, None, hypo_fee_now, 100.0, key="whatif_hypo_fee")
+        fastag = st.number_input("Fastag (₹)", 0.0, None, fastag_now, 50.0, key="whatif_fastag")
+        column = st.selectbox("On Road Price", [road for _, _, _, road in what_if.ON_ROAD_COLUMNS], key="whatif_column")
+
+    new_prices, change = what_if.apply(
+        catalog,
+        tcs_rate=tcs_rate,
+        tcs_threshold=tcs_threshold,
+        insurance_pct=insurance_pct,
+        rto_pct={"Individual": rto_individual, "Corporate": rto_corporate},
+        hypo_fee=None if hypo_fee == hypo_fee_now else hypo_fee,
+        amounts={} if fastag == fastag_now else {"Fastag": fastag},
+    )
+    i = [road for _, _, _, road in what_if.ON_ROAD_COLUMNS].index(column)
+    current = catalog["on_road"][:, i]
+    table = catalog["keys"].assign(**{
+        "Current": current,
+        "New": new_prices[:, i],
+        "Change": change[:, i],
+        "Change %": change[:, i] / current * 100,
+    })
+    changed = (change != 0).any(axis=1)
+    st.caption(
+        f"{len(table)} variants · {int(changed.sum())} with a new on-road price · "
+        f"{column}: average change {format_indian_currency(change[:, i].mean())}"
+    )
+    st.dataframe(
+        table,
+        hide_index=True,
+        column_config={
+            "Current": st.column_config.NumberColumn(format="₹%,d"),
+            "New": st.column_config.NumberColumn(format="₹%,d"),
+            "Change": st.column_config.NumberColumn(format="%,d"),
+            "Change %": st.column_config.NumberColumn(format="%.2f%%"),
+        },
+    )
+
+what_if_view()
+
+
+# --- Pricing View (fragment: category/model/variant changes rerun only this part) ---
+@st.fragment
+@rerun_metrics.measured
+def pricing_view():
+    # --- Category Selection FIRST ---
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        category = st.selectbox("🔍 Category", master_cache.PV_SHEETS, index=0)
+
+    # --- Compare Two Files ---
+    if len(files) > 1 and st.toggle("🔁 Compare Files", key="compare_mode"):
+        cmp_old, cmp_new = st.columns(2)
+        with cmp_old:
+            old_label = st.selectbox("Older File", file_labels, index=1, key="compare_old")
+        with cmp_new:
+            new_label = st.selectbox("Newer File", file_labels, index=0, key="compare_new")
+        if old_label == new_label:
+            st.info("ℹ️ Pick two different files to compare.")
+        else:
+            try:
+                diff = master_cache.get_derived(
+                    [(os.path.join(DATA_DIR, file_map[old_label]), "PV"), (os.path.join(DATA_DIR, file_map[new_label]), "PV")],
+                    "diff",
+                    master_diff.diff_pv,
+                )
+            except Exception as e:
+                st.error(f"❌ Could not compare these files: {e}")
+            else:
+                if category in diff:
+                    app_common.render_diff(diff[category])
+                else:
+                    st.info(f"ℹ️ Both files need a {category} sheet to compare.")
 
-with col2:
-    model = safe_selectbox("🚘 Model", models, "selected_model")
+    backend = serving_backend.get_backend(selected_path, "PV", SERVING_ENGINE)
+    if category not in backend.categories():
+        st.error(f"❌ '{category}' sheet is missing in the selected file.")
+        return
+    available_columns = backend.columns(category)
 
-variant_df = df[df["Model"] == model]
+    # --- Dynamic Dropdowns ---
+    models = sorted(backend.models(category))
+    if not models:
+        st.error("❌ No models found")
+        return
 
-if "Variant" not in variant_df.columns:
-    st.error("❌ 'Variant' column is missing in the selected category sheet.")
-    st.stop()
-variants = sorted(variant_df["Variant"].dropna().unique())
+    with col2:
+        model = safe_selectbox("🚘 Model", models, "selected_model")
 
-variant = safe_selectbox("🎯 Select Variant", variants, "selected_variant")
-filtered_rows = variant_df[variant_df["Variant"] == variant]
+    if "Variant" not in available_columns:
+        st.error("❌ 'Variant' column is missing in the selected category sheet.")
+        return
+    variants = sorted(backend.variants(category, model))
 
-if filtered_rows.empty:
-    st.warning("⚠️ No data available for this variant.")
-    st.stop()
+    variant = safe_selectbox("🎯 Select Variant", variants, "selected_variant")
+    row = backend.row(category, variant, model)
+
+    if row is None:
+        st.warning("⚠️ No data available for this variant.")
+        return
 
-row = filtered_rows.iloc[0]
+    # --- Output ---
+    st.markdown(f"<h2 style='margin-top: -8px; '> 🚙 {model} - {variant}</h2>", unsafe_allow_html=True)
+    st.markdown("<h3 style='color:#e65100; margin-top: -10px; margin-bottom: -8px;'>📝 Vehicle Pricing Details</h3>", unsafe_allow_html=True)
 
-# --- Format Currency ---
-def format_indian_currency(value):
+    shared_fields, group_keys = backend.layout(category)
+
+    if not any(col in row for col in shared_fields + [v for pair in group_keys.values() for v in pair]):
+        st.warning("⚠️ No pricing details available for this variant.")
+    else:
+        st.markdown(render_combined_table(row, shared_fields, group_keys), unsafe_allow_html=True)
+
+    # --- Applicable Discounts (precomputed map: a dictionary lookup) ---
     try:
-        if pd.isnull(value) or value == 0:
-            return "₹0"
-        value = float(value)
-        is_negative = value < 0
-        value = abs(value)
-        s = f"{int(value)}"
-        last_three = s[-3:]
-        other = s[:-3]
-        if other:
-            other = re.sub(r'(\d)(?=(\d{2})+$)', r'\1,', other)
-            formatted = f"{other},{last_three}"
+        discounts = discount_map.lookup(selected_path, category, model, variant)
+    except Exception as e:
+        st.warning(f"⚠️ Discounts not matched: {e}")
+        discounts = None
+    if discounts is not None:
+        st.markdown("<h3 style='color:#e65100; margin-top: -10px; margin-bottom: -8px;'>🏷️ Applicable Discounts</h3>", unsafe_allow_html=True)
+        if discounts is discount_map.LOADING:
+            st.caption("⏳ Discounts loading…")
+        elif not discounts:
+            st.caption("No discount remark applies to this variant.")
         else:
-            formatted = last_three
-        result = f"₹{formatted}"
-        return f"-{result}" if is_negative else result
-    except:
-        return "Invalid"
+            st.markdown(render_discount_table(discounts), unsafe_allow_html=True)
 
-# --- Table Renderer ---
-def render_combined_table(row, shared_fields, grouped_fields, group_keys):
-    html = """
-    <style>
-    .vtable { border-collapse: collapse; width: 100%; font-weight: bold; font-size: 14px; }
-    .vtable th { background-color: #004080; color: white; padding: 4px 6px; text-align: center; }
-    .vtable td { background-color: #f0f4f8; padding: 4px 6px; text-align: center; color: black; font-weight: bold }
-    .vtable td:first-child, .vtable th:first-child { text-align: left; }
-    .vtable, .vtable th, .vtable td { border: 1px solid #000; }
-    </style>
-    <table class='vtable'>
-        <tr><th>Description</th><th>Individual</th><th>Corporate</th></tr>
-    """
-
-    for field in shared_fields:
-        val = format_indian_currency(row.get(field))
-        if "N/A" not in val and "Invalid" not in val:
-            html += f"<tr><td>{field}</td><td>{val}</td><td>{val}</td></tr>"
-            
-    for field in grouped_fields:
-        ind_key, corp_key = group_keys.get(field, ("", ""))
-        ind_val = format_indian_currency(row.get(ind_key))
-        corp_val = format_indian_currency(row.get(corp_key))
-        html += f"<tr><td>{field}</td><td>{ind_val}</td><td>{corp_val}</td></tr>"
-
-    html += "</table>"
-    return html
-
-# --- Output ---
-st.markdown(f"<h2 style='margin-top: -8px; '> 🚙 {model} - {variant}</h2>", unsafe_allow_html=True)
-st.markdown("<h3 style='color:#e65100; margin-top: -10px; margin-bottom: -8px;'>📝 Vehicle Pricing Details</h3>", unsafe_allow_html=True)
-
-available_columns = df.columns
-
-shared_fields_all = [
-    "Ex-Showroom Price", "TCS 1%", "Insurance 1 Yr OD + 3 Yr TP + Zero Dep.",
-    "Accessories Kit", "SMC", "Extended Warranty", "Maxi Care", "RSA (1 Year)", "Fastag"
-]
-shared_fields = [f for f in shared_fields_all if f in available_columns]
-
-group_keys_master = {
-    "RTO (W/O HYPO)": ("RTO (W/O HYPO) - Individual", "RTO (W/O HYPO) - Corporate"),
-    "RTO (With HYPO)": ("RTO (With HYPO) - Individual", "RTO (With HYPO) - Corporate"),
-    "On Road Price (W/O HYPO)": ("On Road Price (W/O HYPO) - Individual", "On Road Price (W/O HYPO) - Corporate"),
-    "On Road Price (With HYPO)": ("On Road Price (With HYPO) - Individual", "On Road Price (With HYPO) - Corporate"),
-}
-
-grouped_fields = []
-group_keys = {}
-for field, (ind_col, corp_col) in group_keys_master.items():
-    if ind_col in available_columns and corp_col in available_columns:
-        grouped_fields.append(field)
-        group_keys[field] = (ind_col, corp_col)
-
-if not any(col in row for col in shared_fields + [v for pair in group_keys.values() for v in pair]):
-    st.warning("⚠️ No pricing details available for this variant.")
-else:
-    st.markdown(render_combined_table(row, shared_fields, grouped_fields, group_keys), unsafe_allow_html=True)
+    # --- Price History (every uploaded file, not just the retained 5) ---
+    if st.toggle("📈 Price History", key="price_history"):
+        history = price_history.variant_history(category, variant, price_history.base_model(model))
+        if history.empty:
+            st.info("ℹ️ No price history recorded for this variant yet.")
+        else:
+            history_fields = history["Field"].unique().tolist()
+            history_field = st.selectbox(
+                "Field",
+                history_fields,
+                index=history_fields.index("Ex-Showroom Price") if "Ex-Showroom Price" in history_fields else 0,
+                key="history_field",
+            )
+            series = history[history["Field"] == history_field]
+            if series["Value"].notna().any():
+                st.line_chart(series.set_index("Date")["Value"])
+            st.dataframe(
+                series.assign(
+                    Date=series["Date"].dt.strftime("%d-%b-%Y"),
+                    Value=[format_indian_currency(v) if pd.notnull(v) else t for v, t in zip(series["Value"], series["Text"])],
+                )[["Date", "Model", "Value"]],
+                hide_index=True,
+            )
+
+
+pricing_view()
+
+
+# --- Speculative Prefetch (queued once this run has rendered) ---
+# PV and EV come from one parse, so the other category is already loaded;
+# the neighbouring files are what a user opens next. Changing file again
+# replaces this session's queue.
+def prefetch_jobs():
+    index = file_labels.index(selected_label)
+    jobs = []
+    for i in (index + 1, index - 1):
+        if not 0 <= i < len(files):
+            continue
+        path = os.path.join(DATA_DIR, files[i][0])
+        jobs.append((("backend", path), lambda path=path: serving_backend.get_backend(path, "PV", SERVING_ENGINE)))
+        jobs.append((("discounts", path), lambda path=path: discount_map.discount_map(path)))
+    return jobs
+
+master_cache.prefetcher.submit(app_common.session_id(), prefetch_jobs())
+rerun_metrics.end_run()
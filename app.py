@@ -0,0 +1,11 @@
+import streamlit as st
+
+# --- Multi-Page Entry Point ---
+# CV and PV are pages of one app: one server process, so both share the
+# workbook cache, file catalog, price history and export/render pools.
+# Each page still runs standalone (streamlit run app-CV.py).
+pages = st.navigation([
+    st.Page("app-CV.py", title="CV Docket Audit", icon="🚛", url_path="cv", default=True),
+    st.Page("app-PV.py", title="PV Pricing Viewer", icon="🚗", url_path="pv"),
+])
+pages.run()
@@ -0,0 +1,175 @@
+import os
+import time
+
+import requests
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import discount_map
+import github_sync
+import lookup_api
+import master_cache
+import price_history
+import rerun_metrics
+
+
+# --- Shared Settings (secrets.toml) ---
+def serving_engine():
+    # "pandas" (default) or "sqlite": set [serving] backend in secrets.toml
+    return st.secrets.get("serving", {}).get("backend", "pandas")
+
+
+def apply_cache_budget():
+    # Byte budget of the shared cache: set [cache] budget_mb in secrets.toml
+    budget_mb = st.secrets.get("cache", {}).get("budget_mb")
+    if budget_mb:
+        master_cache.set_budget(budget_mb)
+
+
+def start_lookup_api():
+    # JSON lookup service inside this server process: set [api] port in secrets.toml
+    api = st.secrets.get("api", {})
+    if not api.get("port"):
+        return
+    try:
+        lookup_api.start_in_background(api.get("host", "127.0.0.1"), int(api["port"]), api.get("token"))
+    except OSError as e:
+        st.sidebar.warning(f"⚠️ Lookup API not started: {e}")
+
+
+def session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
+
+
+def history_recorder(kind, content):
+    # on_ingest for master_cache.ingest_upload: records the upload's prices
+    # before retention may delete an older-dated file again
+    def record(path, book):
+        try:
+            price_history.record_upload(kind, os.path.basename(path), bytes(content), book)
+        except Exception as e:
+            st.sidebar.warning(f"⚠️ Price history not updated: {e}")
+
+    return record
+
+
+def _synced(kind, path):
+    # A file another replica uploaded: same follow-up as a local upload
+    if kind in price_history.HISTORY_KINDS:
+        price_history.record_file(kind, path)
+    if kind in ("PV", "DISCOUNT"):
+        discount_map.warm_async()
+
+
+def start_github_sync():
+    # Pull master files other replicas pushed: set [sync] enabled = true in secrets.toml
+    sync = st.secrets.get("sync", {})
+    if not sync.get("enabled"):
+        return
+    github = st.secrets["github"]
+    github_sync.start_in_background(
+        interval=int(sync.get("interval", github_sync.SYNC_INTERVAL)),
+        owner=github["username"],
+        repo=github["repo"],
+        token=github.get("token"),
+        branch=github.get("branch", "main"),
+        api_url=github.get("api_url", github_sync.API_URL),
+        on_update=_synced,
+    )
+
+
+# --- GitHub Retention ---
+def prune_github(github_dir, pattern):
+    # Delete all but the newest KEEP_FILES dated files from a repo folder,
+    # mirroring master_cache.prune_retention on the local copy
+    github = st.secrets["github"]
+    branch = github.get("branch", "main")
+    headers = {"Authorization": f"Bearer {github['token']}", "Accept": "application/vnd.github+json"}
+    list_url = f"https://api.github.com/repos/{github['username']}/{github['repo']}/contents/{github_dir}"
+    files_resp = requests.get(list_url, headers=headers, params={"ref": branch})
+    if files_resp.status_code != 200:
+        st.sidebar.warning("⚠️ Could not fetch file list from GitHub.")
+        return
+    dated = [(item["name"], master_cache.extract_date_from_filename(item["name"], pattern), item["sha"]) for item in files_resp.json()]
+    dated = sorted([f for f in dated if f[1]], key=lambda x: x[1], reverse=True)
+    for fname, _, sha_to_delete in dated[master_cache.KEEP_FILES:]:
+        del_payload = {"message": f"Auto-delete old Excel file: {fname}", "sha": sha_to_delete, "branch": branch}
+        requests.delete(f"{list_url}/{fname}", headers=headers, json=del_payload)
+
+
+# --- Admin Authentication ---
+def check_admin_password():
+    correct_password = st.secrets["auth"]["admin_password"]
+    if "admin_authenticated" not in st.session_state:
+        st.session_state["admin_authenticated"] = False
+
+    if not st.session_state["admin_authenticated"]:
+        with st.sidebar.expander("🔐 Admin Login", expanded=False):
+            pwd = st.text_input("Enter admin password:", type="password", key="admin_pwd")
+            if st.button("Login", key="admin_login_btn"):
+                if pwd == correct_password:
+                    st.session_state["admin_authenticated"] = True
+                    st.rerun()
+                else:
+                    st.error("❌ Incorrect password.")
+        return False
+    return True
+
+def logout_admin():
+    if st.session_state.get("admin_authenticated", False):
+        if st.sidebar.button("🔓 Logout Admin"):
+            st.session_state["admin_authenticated"] = False
+            st.rerun()
+
+
+# --- Admin Cache Panel ---
+def render_cache_panel():
+    cache = master_cache.cache_stats()
+    prefetch = master_cache.prefetcher.stats
+    st.sidebar.caption(
+        f"🗄️ Cache: {cache['entries']} files · {cache['parses']} parses · "
+        f"{cache['hits']} hits · {cache['coalesced']} coalesced  \n"
+        f"💾 {cache['bytes'] / 2**20:.1f} of {cache['budget'] / 2**20:.0f} MB · "
+        f"{cache['entries'] + cache['derived']} entries · {cache['budget_evictions']} evicted  \n"
+        f"🔮 Prefetch: {prefetch['done']} done · {prefetch['cancelled']} cancelled · {prefetch['skipped']} skipped"
+    )
+    syncer = github_sync.current()
+    if syncer is not None:
+        sync = syncer.stats
+        last = f"{int(time.time() - sync['last_sync'])}s ago" if sync["last_sync"] else "pending"
+        st.sidebar.caption(
+            f"🔄 GitHub sync: {last} · {sync['not_modified']} unchanged · {sync['downloads']} downloaded"
+            + (f"  \n⚠️ {sync['last_error']}" if sync["last_error"] else "")
+        )
+    rerun_metrics.render_sidebar_summary()
+    rerun_metrics.render_profiler_controls()
+
+
+# --- Government Services (Sidebar Shortcuts) ---
+def render_government_services():
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("### 🗂️ Government Services")
+
+    with st.sidebar:
+        st.link_button("🏦 BLP Gujarat - Application Status", "https://blp.gujarat.gov.in/appstatussearch.php")
+        st.link_button("🏢 Udyam Registration Verification", "https://udyamregistration.gov.in/Government-India/Ministry-MSME-registration.htm")
+        st.link_button("🧾 Aadhaar–PAN Link Status", "https://eportal.incometax.gov.in/iec/foservices/#/pre-login/link-aadhaar-status")
+
+
+# --- Compare Two Files ---
+def render_diff(result):
+    changes = result["changes"]
+    st.caption(
+        f"{result['compared']} variants compared · {len(changes)} changed values · "
+        f"{len(result['added'])} added · {len(result['removed'])} removed"
+    )
+    if not changes.empty:
+        changes = changes.assign(Old=changes["Old"].fillna("").astype(str), New=changes["New"].fillna("").astype(str))
+        st.dataframe(changes, hide_index=True)
+    if len(result["added"]):
+        st.markdown("**🆕 Added Variants**")
+        st.dataframe(result["added"], hide_index=True)
+    if len(result["removed"]):
+        st.markdown("**🗑️ Removed Variants**")
+        st.dataframe(result["removed"], hide_index=True)
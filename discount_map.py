@@ -0,0 +1,162 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import master_cache
+import price_history
+import streamlit_discount_matcher as matcher
+
+
+# --- Price List Catalog ---
+# The matcher's view of a PV price list: one row per PV/EV variant, model
+# without its month tag, fuel from the model name (EV sheet: electric).
+def _fuel(category, model):
+    if category == "EV":
+        return "Ev"
+    return matcher.extract_fuel_from_anywhere(model.replace("DSL", "DIESEL")) or ""
+
+
+def pv_catalog(book):
+    frames = []
+    for category, frame in book.items():
+        if "Variant" not in frame.columns or "Model" not in frame.columns:
+            continue
+        rows = frame[["Model", "Variant"]].dropna(subset=["Variant"])
+        models = rows["Model"].fillna("").astype(str)
+        frames.append(pd.DataFrame({
+            "Category": category,
+            "Sheet Model": models.to_numpy(),
+            "Variant": rows["Variant"].to_numpy(),
+            "Model": models.map(price_history.base_model).to_numpy(),
+            "Fuel Type": [_fuel(category, m) for m in models],
+        }))
+    if not frames:
+        return pd.DataFrame(columns=["Category", "Sheet Model", "Variant", "Model", "Fuel Type"])
+    return pd.concat(frames, ignore_index=True)
+
+
+# --- Variant -> Discounts Map ---
+# Built once per (price list, discount sheet) version pair and cached with
+# the workbooks; the PV view then only does a dictionary lookup.
+def _details(discounts):
+    columns = [col for col in discounts.columns if col != "Remark"]
+    for values in discounts[columns].itertuples(index=False, name=None):
+        yield [(col, value) for col, value in zip(columns, values) if pd.notnull(value) and str(value).strip() != ""]
+
+
+def build_discount_map(book, discounts):
+    catalog = pv_catalog(book)
+    index = matcher.CatalogBits(catalog)
+    keys = list(zip(catalog["Category"], catalog["Sheet Model"], catalog["Variant"]))
+    remarks = discounts["Remark"].tolist()
+
+    mapping = {}
+    for remark, rule, details in zip(remarks, matcher.parse_remarks(remarks), _details(discounts)):
+        if rule is None:
+            continue
+        bits = index.rule_bits(rule)
+        if not bits:
+            continue
+        entry = {"Remark": remark.strip(), "Details": details}
+        for row in np.flatnonzero(matcher.bits_to_mask(bits, index.size)):
+            mapping.setdefault(keys[row], []).append(entry)
+    return mapping
+
+
+def build_overlap_report(book, discounts):
+    return matcher.analyze_rule_overlaps(pv_catalog(book), discounts["Remark"].tolist())
+
+
+def latest_discount_sheet():
+    files = master_cache.list_recent_files("DISCOUNT")
+    if not files:
+        return None
+    return os.path.join(master_cache.DISCOUNT_DATA_DIR, files[0][0])
+
+
+def discount_map(pv_path, discount_path=None):
+    discount_path = discount_path or latest_discount_sheet()
+    if discount_path is None:
+        return None
+    return master_cache.get_derived([(pv_path, "PV"), (discount_path, "DISCOUNT")], "discount_map", build_discount_map)
+
+
+def overlap_report(pv_path, discount_path=None):
+    discount_path = discount_path or latest_discount_sheet()
+    if discount_path is None:
+        return None
+    return master_cache.get_derived(
+        [(pv_path, "PV"), (discount_path, "DISCOUNT")], "discount_overlaps", build_overlap_report
+    )
+
+
+# The view never builds the map itself: until a build thread has it,
+# lookup() answers LOADING and the page renders without the discounts.
+LOADING = object()
+_builds = {}  # file versions -> build error, None while the build runs
+_builds_lock = threading.Lock()
+
+
+def _build(versions, pv_path, discount_path):
+    try:
+        discount_map(pv_path, discount_path)
+    except Exception as e:
+        # Kept until either file changes, so a broken file isn't rebuilt per rerun
+        with _builds_lock:
+            _builds[versions] = e
+        return
+    with _builds_lock:
+        _builds.pop(versions, None)
+
+
+def lookup(pv_path, category, model, variant):
+    # -> None without a discount sheet, LOADING while the map is being built,
+    # else the rules applying to this variant (a failed build is re-raised)
+    discount_path = latest_discount_sheet()
+    if discount_path is None:
+        return None
+    sources = [(pv_path, "PV"), (discount_path, "DISCOUNT")]
+    hit, mapping = master_cache.peek_derived(sources, "discount_map")
+    if hit:
+        return mapping.get((category, model, variant), [])
+    versions = tuple(master_cache.file_fingerprint(path) for path, _ in sources)
+    with _builds_lock:
+        if versions in _builds:
+            if _builds[versions] is not None:
+                raise _builds[versions]
+            return LOADING
+        _builds[versions] = None
+    threading.Thread(
+        target=_build, args=(versions, pv_path, discount_path), name="discount-map-build", daemon=True
+    ).start()
+    return LOADING
+
+
+# --- Background Build (startup, and after either file is uploaded) ---
+def _warm():
+    for fname, _ in master_cache.list_recent_files("PV"):
+        try:
+            discount_map(os.path.join(master_cache.PV_DATA_DIR, fname))
+        except Exception:
+            # The session that views this file will surface the error
+            continue
+
+
+def warm_async():
+    threading.Thread(target=_warm, name="discount-map-warm", daemon=True).start()
+
+
+_warm_started = False
+_warm_lock = threading.Lock()
+
+
+def start_prewarm():
+    # Once per process
+    global _warm_started
+    with _warm_lock:
+        if _warm_started:
+            return
+        _warm_started = True
+    warm_async()
@@ -0,0 +1,189 @@
+import hashlib
+import os
+import threading
+
+import pandas as pd
+import xlsxwriter
+
+import master_cache
+import price_book
+
+EXPORT_DIR = "Data/.exports"
+# Excel's own Indian grouping (₹12,34,567), so amounts stay numeric
+INDIAN_CURRENCY = '[>=10000000]"₹"##\\,##\\,##\\,##0;[>=100000]"₹"##\\,##\\,##0;"₹"##,##0'
+
+
+# --- Cell Values ---
+# Amounts the app shows as "₹0" (blank or zero) are written as 0, text
+# stays text; offers the app leaves out are left empty.
+def _amount(value):
+    if pd.isnull(value):
+        return 0.0
+    return float(value) if pd.api.types.is_number(value) else str(value)
+
+
+def _offer(value):
+    if pd.isnull(value) or value == 0 or str(value).strip() == "":
+        return None
+    return float(value) if pd.api.types.is_number(value) else str(value)
+
+
+class _SheetWriter:
+    # constant_memory flushes each row as soon as the next one starts, so
+    # everything is written strictly top to bottom, left to right.
+    def __init__(self, workbook, name, formats):
+        self.sheet = workbook.add_worksheet(name)
+        self.formats = formats
+        self.row = 0
+
+    def groups(self, spans):
+        # spans: [(label, width), ...] across the top header row
+        col = 0
+        for label, width in spans:
+            if width > 1:
+                self.sheet.merge_range(self.row, col, self.row, col + width - 1, label, self.formats["group"])
+            elif width == 1:
+                self.sheet.write(self.row, col, label, self.formats["group"])
+            col += width
+        self.row += 1
+
+    def header(self, labels, widths):
+        for col, (label, width) in enumerate(zip(labels, widths)):
+            self.sheet.set_column(col, col, width)
+            self.sheet.write_string(self.row, col, label, self.formats["header"])
+        self.row += 1
+        self.sheet.freeze_panes(self.row, 2)
+
+    def values(self, values):
+        for col, value in enumerate(values):
+            if value is None:
+                continue
+            if isinstance(value, float):
+                self.sheet.write_number(self.row, col, value, self.formats["amount"])
+            else:
+                self.sheet.write_string(self.row, col, value, self.formats["text"])
+        self.row += 1
+
+
+# --- Sheets ---
+def _write_cv(workbook, formats, book):
+    raw = book["raw"]
+    header_row0, header_row1 = raw.iloc[0], raw.iloc[1]
+    cartel_groups = header_row0.iloc[price_book.CARTEL_START_COL:].ffill()
+    cartel_subs = header_row1.iloc[price_book.CARTEL_START_COL:]
+    last_col = cartel_subs.last_valid_index()
+    cartel_cols = list(range(price_book.CARTEL_START_COL, last_col + 1)) if last_col is not None else []
+
+    writer = _SheetWriter(workbook, "Price Book", formats)
+    spans = [("MODEL & VARIANT", 2), ("VEHICLE PRICE (excl. MAXI CARE)", len(price_book.CV_PRICING_FIELDS))]
+    for col in cartel_cols:
+        group = cartel_groups.loc[col]
+        label = "" if pd.isnull(group) else str(group)
+        if spans[-1][0] == label and len(spans) > 2:
+            spans[-1] = (label, spans[-1][1] + 1)
+        else:
+            spans.append((label, 1))
+    writer.groups(spans)
+    writer.header(
+        ["Model", "Variant"] + price_book.CV_PRICING_FIELDS
+        + [price_book.normalize_header_text(cartel_subs.loc[col]) for col in cartel_cols],
+        [24, 32] + [16] * (len(price_book.CV_PRICING_FIELDS) + len(cartel_cols)),
+    )
+
+    grid = raw.iloc[2:]
+    data = pd.concat([book["data"], book["derived"]], axis=1)
+    for (_, row), (_, raw_row) in zip(data.iterrows(), grid.iterrows()):
+        if pd.isnull(row.get("Variant")):
+            continue
+        writer.values(
+            [str(raw_row.iloc[0]) if pd.notnull(raw_row.iloc[0]) else None, str(row["Variant"])]
+            + [_amount(val) for _, val in price_book.cv_pricing(row)]
+            + [_offer(raw_row.iloc[col]) for col in cartel_cols]
+        )
+
+
+def _write_pv(workbook, formats, book):
+    for category, frame in book.items():
+        if "Variant" not in frame.columns or "Model" not in frame.columns:
+            continue
+        shared_fields, group_keys = price_book.pv_layout(frame.columns)
+
+        writer = _SheetWriter(workbook, category, formats)
+        writer.groups(
+            [("MODEL & VARIANT", 2), ("PRICE", len(shared_fields))] + [(field, 2) for field in group_keys]
+        )
+        writer.header(
+            ["Model", "Variant"] + shared_fields + ["Individual", "Corporate"] * len(group_keys),
+            [24, 32] + [16] * (len(shared_fields) + 2 * len(group_keys)),
+        )
+
+        columns = ["Model", "Variant"] + shared_fields + [col for pair in group_keys.values() for col in pair]
+        for values in frame.dropna(subset=["Variant"])[columns].itertuples(index=False, name=None):
+            model, variant, amounts = values[0], values[1], values[2:]
+            writer.values(
+                [str(model) if pd.notnull(model) else None, str(variant)] + [_amount(val) for val in amounts]
+            )
+
+
+WRITERS = {"CV": _write_cv, "PV": _write_pv}
+
+
+def write_price_book(kind, book, out_path):
+    tmp_path = f"{out_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    workbook = xlsxwriter.Workbook(tmp_path, {"constant_memory": True, "tmpdir": os.path.dirname(out_path) or "."})
+    formats = {
+        "group": workbook.add_format({"bold": True, "align": "center", "font_color": "#004080", "border": 1}),
+        "header": workbook.add_format(
+            {"bold": True, "text_wrap": True, "valign": "top", "bg_color": "#004080", "font_color": "white", "border": 1}
+        ),
+        "amount": workbook.add_format({"num_format": INDIAN_CURRENCY, "border": 1}),
+        "text": workbook.add_format({"border": 1}),
+    }
+    try:
+        WRITERS[kind](workbook, formats, book)
+        workbook.close()
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# --- Export Files (one per master file version, reused across sessions) ---
+_flight = master_cache.SingleFlight()
+
+
+def _export_path(key):
+    stem = os.path.splitext(os.path.basename(key[0]))[0]
+    digest = hashlib.sha1(repr(key[1:]).encode()).hexdigest()[:16]
+    return os.path.join(EXPORT_DIR, f"{stem}.{digest}.xlsx")
+
+
+def _remove_stale_exports(keep):
+    # Exports of older versions of this file, or of pruned files
+    stem = os.path.basename(keep).rsplit(".", 2)[0]
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        if path == keep or not name.endswith(".xlsx"):
+            continue
+        source = name.rsplit(".", 2)[0]
+        gone = not any(os.path.exists(os.path.join(d, f"{source}.xlsx")) for d, _ in master_cache.CATALOGS.values())
+        if source == stem or gone:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def export_price_book(path, kind):
+    # -> path of the .xlsx; written once per file version
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    key, book = master_cache.open_workbook(path, kind)
+    out_path = _export_path(key)
+
+    def build():
+        if not os.path.exists(out_path):
+            write_price_book(kind, book, out_path)
+            _remove_stale_exports(out_path)
+        return out_path
+
+    return _flight.do(out_path, build)
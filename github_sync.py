@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+
+import requests
+
+import master_cache
+
+API_URL = "https://api.github.com"
+SYNC_INTERVAL = 300  # seconds between listings
+SYNC_CONCURRENCY = 4  # downloads in flight at once
+REQUEST_TIMEOUT = 60
+
+
+def git_blob_sha(content):
+    # The "sha" GitHub lists for a file: SHA-1 over "blob <size>\0" + content
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+def _local_sha(path):
+    try:
+        with open(path, "rb") as f:
+            return git_blob_sha(f.read())
+    except FileNotFoundError:
+        return None
+
+
+# --- Repo -> DATA_DIR Sync ---
+# Each catalog's directory is listed with If-None-Match: while nothing
+# changed upstream a pass costs one 304 per directory (GitHub does not count
+# those against the rate limit). After a change, only master files whose
+# blob sha differs from the local copy are downloaded, a few at a time,
+# checked against that sha, written atomically and published to the file
+# catalog. HTTP runs on worker threads (requests); asyncio schedules it.
+class GitHubSync:
+    def __init__(self, owner, repo, token=None, branch="main", api_url=API_URL, kinds=None,
+                 concurrency=SYNC_CONCURRENCY, on_update=None):
+        self.base = f"{api_url.rstrip('/')}/repos/{owner}/{repo}/contents"
+        self.branch = branch
+        self.kinds = list(kinds or master_cache.CATALOGS)
+        self.concurrency = concurrency
+        # on_update(kind, path) runs after a file is written and published
+        self.on_update = on_update
+        self.headers = {"Accept": "application/vnd.github+json", "X-GitHub-Api-Version": "2022-11-28"}
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+        self._etags = {}
+        self._local = threading.local()
+        self.stats = {"passes": 0, "not_modified": 0, "listings": 0, "downloads": 0, "errors": 0,
+                      "last_sync": None, "last_error": None}
+
+    def _session(self):
+        # One keep-alive session per worker thread
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _get(self, url, headers):
+        return self._session().get(url, headers=headers, params={"ref": self.branch}, timeout=REQUEST_TIMEOUT)
+
+    async def _list(self, kind):
+        # -> [(name, sha), ...] of master files, or None when unchanged
+        data_dir, pattern = master_cache.CATALOGS[kind]
+        headers = dict(self.headers)
+        if kind in self._etags:
+            headers["If-None-Match"] = self._etags[kind]
+        response = await asyncio.to_thread(self._get, f"{self.base}/{data_dir}", headers)
+        if response.status_code == 304:
+            self.stats["not_modified"] += 1
+            return None
+        if response.status_code == 404:
+            # Directory not in the repo (yet)
+            return []
+        response.raise_for_status()
+        self.stats["listings"] += 1
+        items = [
+            (item["name"], item["sha"])
+            for item in response.json()
+            if item.get("type") == "file" and re.match(pattern, item["name"])
+        ]
+        if response.headers.get("ETag"):
+            self._etags[kind] = response.headers["ETag"]
+        return items
+
+    async def _download(self, kind, name, sha, limit):
+        data_dir, _ = master_cache.CATALOGS[kind]
+        headers = dict(self.headers, Accept="application/vnd.github.raw")
+        async with limit:
+            response = await asyncio.to_thread(self._get, f"{self.base}/{data_dir}/{name}", headers)
+        response.raise_for_status()
+        content = response.content
+        if git_blob_sha(content) != sha:
+            raise ValueError(f"{name}: content does not match the listed sha")
+        path = os.path.join(data_dir, name)
+        await asyncio.to_thread(master_cache.atomic_write, path, content)
+        self.stats["downloads"] += 1
+        return path
+
+    async def _notify(self, kind, path):
+        # A failing callback is recorded; it doesn't stop the other files
+        if self.on_update is None:
+            return
+        try:
+            await asyncio.to_thread(self.on_update, kind, path)
+        except Exception as e:
+            self.stats["errors"] += 1
+            self.stats["last_error"] = f"{kind}: on_update({os.path.basename(path)}): {type(e).__name__}: {e}"
+
+    async def _sync_kind(self, kind, limit):
+        data_dir, pattern = master_cache.CATALOGS[kind]
+        items = await self._list(kind)
+        if not items:
+            return []
+        os.makedirs(data_dir, exist_ok=True)
+        # Only the newest KEEP_FILES are kept locally, so only those are fetched
+        dated = [(master_cache.extract_date_from_filename(name, pattern), name, sha) for name, sha in items]
+        dated = [(name, sha) for _, name, sha in sorted((d for d in dated if d[0]), reverse=True)][:master_cache.KEEP_FILES]
+        shas = await asyncio.gather(*(asyncio.to_thread(_local_sha, os.path.join(data_dir, n)) for n, _ in dated))
+        stale = [(name, sha) for (name, sha), local in zip(dated, shas) if local != sha]
+        results = await asyncio.gather(
+            *(self._download(kind, name, sha, limit) for name, sha in stale), return_exceptions=True
+        )
+        paths = [r for r in results if isinstance(r, str)]
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if paths:
+            master_cache.publish_catalog(kind)
+            # Before pruning, so a file that falls outside KEEP_FILES is still seen
+            for path in paths:
+                await self._notify(kind, path)
+            master_cache.prune_retention(kind)
+        if errors:
+            # Downloaded files are kept; the ETag is dropped so the next pass retries the rest
+            self._etags.pop(kind, None)
+            raise errors[0]
+        return paths
+
+    async def sync_once(self):
+        # -> {kind: [paths written]}; one pass over every catalog
+        limit = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._sync_kind(kind, limit) for kind in self.kinds), return_exceptions=True)
+        self.stats["passes"] += 1
+        self.stats["last_sync"] = time.time()
+        written = {}
+        for kind, result in zip(self.kinds, results):
+            if isinstance(result, BaseException):
+                self.stats["errors"] += 1
+                self.stats["last_error"] = f"{kind}: {type(result).__name__}: {result}"
+            elif result:
+                written[kind] = result
+        return written
+
+    async def run(self, interval=SYNC_INTERVAL):
+        while True:
+            await self.sync_once()
+            await asyncio.sleep(interval)
+
+
+# --- Background Sync (once per server process) ---
+_syncer = None
+_syncer_lock = threading.Lock()
+
+
+def start_in_background(interval=SYNC_INTERVAL, **kwargs):
+    global _syncer
+    with _syncer_lock:
+        if _syncer is not None:
+            return _syncer
+        _syncer = GitHubSync(**kwargs)
+    syncer = _syncer
+    threading.Thread(target=lambda: asyncio.run(syncer.run(interval)), name="github-sync", daemon=True).start()
+    return syncer
+
+
+def current():
+    return _syncer
@@ -0,0 +1,28 @@
+import re
+from functools import lru_cache
+
+
+# --- Styles ---
+# Compacted once per process. The resulting <style> element is large enough
+# to be cacheable (see .streamlit/config.toml), so after the first run the
+# browser gets a short hash reference instead of the stylesheet.
+@lru_cache(maxsize=None)
+def style_block(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    return f"<style>{css.strip()}</style>"
+
+
+# --- Table Templates ---
+ROW_2 = "<tr><td>{}</td><td>{}</td></tr>".format
+ROW_3 = "<tr><td>{}</td><td>{}</td><td>{}</td></tr>".format
+HEADER_2 = "<tr><th>{}</th><th>{}</th></tr>".format
+HEADER_3 = "<tr><th>{}</th><th>{}</th><th>{}</th></tr>".format
+GROUP_HEADER = (
+    "<tr><th colspan='2' class='cartel-group' style='background:#ffffff; text-align:left;'>{}</th></tr>"
+).format
+
+
+def table(css_class, parts):
+    return f"<table class='{css_class}'>{''.join(parts)}</table>"
@@ -0,0 +1,293 @@
+# --- JSON Lookup Service ---
+# The apps' price and cartel lookups over HTTP, from the same loaders and
+# caches. Run it on its own from the repository root:
+#     python lookup_api.py --port 8600
+# or inside the Streamlit server (sharing its caches) with [api] port in
+# secrets.toml.
+#     GET  /v1/files?kind=PV
+#     GET  /v1/lookup?kind=CV&variant=...&date=2026-05-08
+#     POST /v1/lookup  {"kind": "PV", "date": "2025-09-20",
+#                       "items": [{"category": "PV", "model": "...", "variant": "..."}, ...]}
+# "date" picks the master file in force that day (newest dated on or before
+# it), else the newest file answers. Connections are kept alive (HTTP/1.1).
+import argparse
+import json
+import os
+import threading
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+import master_cache
+import price_book
+import serving_backend
+
+MAX_BODY = 4 * 2**20
+MAX_ITEMS = 10000
+
+
+class QueryError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _plain(value):
+    if pd.isnull(value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+# --- Lookup Tables (built once per master file version) ---
+# Every variant's answer is prepared up front; a lookup is a dict get. Keys
+# are (category, model, variant) with None for "any", first row wins.
+def _index(entries):
+    table = {}
+    for entry in entries:
+        for key in (
+            (entry["category"], entry["model"], entry["variant"]),
+            (entry["category"], None, entry["variant"]),
+            (None, None, entry["variant"]),
+        ):
+            table.setdefault(key, entry)
+    return table
+
+
+def _cv_entries(book):
+    backend = serving_backend.FrameBackend("CV", book)
+    header_row0, header_row1 = backend.cartel_headers()
+    frame = backend.frames["CV"]
+    for _, row in frame.dropna(subset=["Variant"]).iterrows():
+        raw_row = backend.raw_row(row["Variant"])
+        cartel = price_book.cv_cartel(header_row0, header_row1, raw_row) if raw_row is not None else []
+        yield {
+            "category": "CV",
+            "model": _plain(row["_model"]),
+            "variant": _plain(row["Variant"]),
+            "pricing": {col: _plain(val) for col, val in price_book.cv_pricing(row)},
+            "cartel": [
+                {"group": _plain(group), "offers": {sub: _plain(val) for sub, val in offers}} for group, offers in cartel
+            ],
+            "total_cartel_benefit": _plain(row[price_book.CV_TOTAL_BENEFIT]),
+            "net_effective_price": _plain(row[price_book.CV_NET_PRICE]),
+        }
+
+
+def _pv_entries(book):
+    for category, frame in book.items():
+        if "Variant" not in frame.columns or "Model" not in frame.columns:
+            continue
+        shared_fields, group_keys = price_book.pv_layout(frame.columns)
+        for _, row in frame.dropna(subset=["Variant"]).iterrows():
+            yield {
+                "category": category,
+                "model": _plain(row["Model"]),
+                "variant": _plain(row["Variant"]),
+                "pricing": {
+                    field: {"individual": _plain(ind), "corporate": _plain(corp)}
+                    for field, ind, corp in price_book.pv_pricing(row, shared_fields, group_keys)
+                },
+            }
+
+
+ENTRY_BUILDERS = {"CV": _cv_entries, "PV": _pv_entries}
+
+
+def lookup_table(path, kind):
+    return master_cache.get_derived([(path, kind)], "lookup_table", lambda book: _index(ENTRY_BUILDERS[kind](book)))
+
+
+# --- Queries ---
+def _parse_date(text):
+    if not isinstance(text, str):
+        raise QueryError("date must be a string: YYYY-MM-DD or DD.MM.YYYY")
+    for fmt in ("%Y-%m-%d", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise QueryError(f"Bad date {text!r}; use YYYY-MM-DD or DD.MM.YYYY")
+
+
+def _kind(kind):
+    if not isinstance(kind, str) or kind not in ENTRY_BUILDERS:
+        raise QueryError(f"Unknown kind {kind!r}; use CV or PV")
+    return kind
+
+
+def resolve_file(kind, on=None):
+    # -> (path, file date) of the master file in force on `on` (default: newest)
+    files = master_cache.list_dated_files(kind)
+    if on is not None:
+        day = _parse_date(on)
+        files = [f for f in files if f[1] <= day]
+    if not files:
+        raise QueryError(f"No {kind} master file" + (f" on or before {on}" if on else ""), status=404)
+    name, file_date = files[0]
+    return os.path.join(master_cache.CATALOGS[kind][0], name), file_date
+
+
+def lookup(kind, items, on=None):
+    kind = _kind(kind)
+    if len(items) > MAX_ITEMS:
+        raise QueryError(f"At most {MAX_ITEMS} items per request", status=413)
+    path, file_date = resolve_file(kind, on)
+    table = lookup_table(path, kind)
+    results = []
+    for item in items:
+        if isinstance(item, str):
+            item = {"variant": item}
+        elif not isinstance(item, dict):
+            raise QueryError("Each item is a variant name or {category, model, variant}")
+        key = (item.get("category"), item.get("model"), item.get("variant"))
+        if not all(part is None or isinstance(part, str) for part in key):
+            raise QueryError("category, model and variant must be strings")
+        entry = table.get(key)
+        if entry is None:
+            results.append({**item, "error": "not found"})
+        else:
+            results.append(entry)
+    return {"kind": kind, "file": os.path.basename(path), "date": file_date.date().isoformat(), "results": results}
+
+
+def list_files(kind):
+    kind = _kind(kind)
+    return {
+        "kind": kind,
+        "files": [{"name": name, "date": dt.date().isoformat()} for name, dt in master_cache.list_dated_files(kind)],
+    }
+
+
+# --- HTTP Server ---
+class LookupHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; with Nagle on, a kept-alive
+    # connection would wait out the client's delayed ACK on every response
+    disable_nagle_algorithm = True
+    server_version = "PriceLookup/1"
+    token = None
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        if self.token and self.headers.get("Authorization") != f"Bearer {self.token}":
+            self._send(401, {"error": "unauthorized"})
+            return False
+        return True
+
+    def _answer(self, route):
+        try:
+            status, payload = 200, route()
+        except QueryError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        self._send(status, payload)
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path == "/v1/health":
+            self._send(200, {"status": "ok"})
+        elif url.path == "/v1/files":
+            self._answer(lambda: list_files(query.get("kind", "")))
+        elif url.path == "/v1/lookup":
+            item = {k: query[k] for k in ("category", "model", "variant") if k in query}
+            self._answer(lambda: lookup(query.get("kind", ""), [item], query.get("date")))
+        else:
+            self._send(404, {"error": "not found"})
+
+    def _refuse(self, status, message):
+        # The body was not read, so the connection can't be reused
+        self.close_connection = True
+        self._send(status, {"error": message})
+
+    def do_POST(self):
+        header = self.headers.get("Content-Length")
+        if header is None:
+            self._refuse(411, "Content-Length required")
+            return
+        try:
+            length = int(header)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._refuse(400, "bad Content-Length")
+            return
+        if length > MAX_BODY:
+            self._refuse(413, "request body too large")
+            return
+        body = self.rfile.read(length)
+        if not self._authorized():
+            return
+        if urlsplit(self.path).path != "/v1/lookup":
+            self._send(404, {"error": "not found"})
+            return
+        try:
+            request = json.loads(body or b"{}")
+            items = request.get("items") or request.get("variants") or []
+            if not isinstance(items, list):
+                raise ValueError("items must be a list")
+        except (ValueError, AttributeError) as e:
+            self._send(400, {"error": f"Bad request body: {e}"})
+            return
+        self._answer(lambda: lookup(request.get("kind", ""), items, request.get("date")))
+
+    def log_message(self, format, *args):
+        # One line per request would cost more than the lookup itself
+        pass
+
+
+def make_server(host="127.0.0.1", port=8600, token=None):
+    handler = type("Handler", (LookupHandler,), {"token": token})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+# --- In-Process Server (once per Streamlit process) ---
+_server_started = False
+_server_lock = threading.Lock()
+
+
+def start_in_background(host="127.0.0.1", port=8600, token=None):
+    # Tried once per process; a port already in use raises OSError once
+    global _server_started
+    with _server_lock:
+        if _server_started:
+            return
+        _server_started = True
+    server = make_server(host, port, token)
+    threading.Thread(target=server.serve_forever, name="lookup-api", daemon=True).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON price and cartel lookups over the master files")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--token", default=os.environ.get("LOOKUP_API_TOKEN"), help="require 'Authorization: Bearer <token>'")
+    parser.add_argument("--no-prewarm", action="store_true", help="parse master files on first lookup instead")
+    args = parser.parse_args()
+    if not args.no_prewarm:
+        master_cache.start_prewarm()
+    server = make_server(args.host, args.port, args.token)
+    print(f"Serving lookups on http://{args.host}:{args.port}/v1/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
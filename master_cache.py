@@ -0,0 +1,652 @@
+import io
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import price_book
+
+# --- Master File Catalogs ---
+CV_DATA_DIR = "Data/Discount_Cheker"
+CV_FILE_PATTERN = r"CV Discount Check Master File (\d{2})\.(\d{2})\.(\d{4})\.xlsx"
+PV_DATA_DIR = "Data/Price_List"
+PV_FILE_PATTERN = r"PV Price List Master D\. (\d{2})\.(\d{2})\.(\d{4})\.xlsx"
+DISCOUNT_DATA_DIR = "Data/Discount_Remarks"
+DISCOUNT_FILE_PATTERN = r"PV Discount Remarks (\d{2})\.(\d{2})\.(\d{4})\.xlsx"
+PV_SHEETS = ["PV", "EV"]
+KEEP_FILES = 5
+# Byte budget for everything in the shared cache; apps can override it
+# from secrets ([cache] budget_mb) through set_budget()
+CACHE_BUDGET_MB = int(os.environ.get("MASTER_CACHE_BUDGET_MB", "256"))
+
+CATALOGS = {
+    "CV": (CV_DATA_DIR, CV_FILE_PATTERN),
+    "PV": (PV_DATA_DIR, PV_FILE_PATTERN),
+    "DISCOUNT": (DISCOUNT_DATA_DIR, DISCOUNT_FILE_PATTERN),
+}
+
+
+def extract_date_from_filename(filename, pattern):
+    match = re.match(pattern, filename)
+    if match:
+        try:
+            day, month, year = match.groups()
+            return datetime.strptime(f"{day}.{month}.{year}", "%d.%m.%Y")
+        except ValueError:
+            return None
+    return None
+
+
+# --- File Catalog (read-copy-update) ---
+# Readers take the published snapshot without locking. Writers scan the
+# directory into a new tuple and swap the reference; a snapshot is never
+# mutated. The directory mtime tells readers when a snapshot is out of date.
+_catalogs = {}
+
+
+def _scan_catalog(kind):
+    data_dir, pattern = CATALOGS[kind]
+    version = os.stat(data_dir).st_mtime_ns
+    files = [(f, extract_date_from_filename(f, pattern)) for f in os.listdir(data_dir)]
+    files = tuple(sorted([f for f in files if f[1]], key=lambda x: x[1], reverse=True))
+    return version, files
+
+
+def publish_catalog(kind):
+    snapshot = _scan_catalog(kind)
+    _catalogs[kind] = snapshot
+    return snapshot[1]
+
+
+def list_dated_files(kind):
+    data_dir, _ = CATALOGS[kind]
+    os.makedirs(data_dir, exist_ok=True)
+    snapshot = _catalogs.get(kind)
+    if snapshot is None or snapshot[0] != os.stat(data_dir).st_mtime_ns:
+        return publish_catalog(kind)
+    return snapshot[1]
+
+
+def list_recent_files(kind):
+    return list_dated_files(kind)[:KEEP_FILES]
+
+
+# --- Atomic Writes ---
+# The temp name starts with "." so it never matches a master file pattern;
+# os.replace() swaps the finished file in, so a reader opens either the old
+# complete file or the new complete file, never a partial one.
+# mkstemp creates the file 0600; the result gets the mode open() would have
+# given it (or keeps the mode of the file it replaces). The umask can only
+# be read by setting it, so that happens once, at import.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def atomic_write(path, content):
+    directory = os.path.dirname(path) or "."
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    # Persist the rename itself (no-op where directories can't be opened)
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+# --- Workbook Parsers ---
+# Each master file is opened with openpyxl exactly once; every table the apps
+# show is then sliced out of the parsed sheets.
+def _header_labels(values):
+    labels, seen = [], {}
+    for i, value in enumerate(values):
+        label = f"Unnamed: {i}" if pd.isnull(value) else str(value)
+        if label in seen:
+            seen[label] += 1
+            label = f"{label}.{seen[label]}"
+        else:
+            seen[label] = 0
+        labels.append(label)
+    return labels
+
+
+def parse_cv_workbook(source):
+    sheets = pd.read_excel(source, sheet_name=["Sheet1", "Report"], header=None)
+    raw = sheets["Sheet1"]
+
+    # Same frame as read_excel(header=1) with the first column dropped
+    data = raw.iloc[2:].reset_index(drop=True)
+    data.columns = _header_labels(raw.iloc[1].tolist())
+    data = data.drop(data.columns[0], axis=1).infer_objects()
+    data.columns = [str(col).strip().replace("\n", " ").replace("  ", " ") for col in data.columns]
+
+    # Important points live in Report!F6:G25
+    points = sheets["Report"].reindex(columns=[5, 6]).iloc[5:25].dropna()
+    points.columns = ["Sr.", "Points"]
+
+    book = {"data": data, "raw": raw, "points": points}
+    # Derived price columns, once per file version for every reader
+    book["derived"] = price_book.cv_derived(book)
+    return book
+
+
+def parse_pv_workbook(source):
+    # Only the category sheets; anything else in the workbook is ignored
+    with pd.ExcelFile(source) as workbook:
+        names = [name for name in PV_SHEETS if name in workbook.sheet_names]
+        sheets = pd.read_excel(workbook, sheet_name=names)
+    for df in sheets.values():
+        df.columns = [str(col).strip() for col in df.columns]
+    return sheets
+
+
+# Sr / Sr. No. / SR NO / Sl. No. / S.No / Serial No: numbering, not a discount
+SERIAL_COLUMN = r"(?i)(s[rl]\.?|serial)(\s*no\.?)?|s\.?\s*no\.?"
+
+
+def parse_discount_sheet(source):
+    # First sheet; the remark column is the one headed "Remark" (else the
+    # first column), every other column is shown alongside it
+    sheet = pd.read_excel(source, sheet_name=0)
+    sheet.columns = [str(col).strip() for col in sheet.columns]
+    remark_col = next((col for col in sheet.columns if "REMARK" in col.upper()), sheet.columns[0])
+    sheet = sheet.rename(columns={remark_col: "Remark"})
+    sheet = sheet[sheet["Remark"].map(lambda v: isinstance(v, str) and v.strip() != "")]
+    keep = [col for col in sheet.columns if not col.startswith("Unnamed") and not re.fullmatch(SERIAL_COLUMN, col)]
+    return sheet.loc[:, keep].reset_index(drop=True)
+
+
+PARSERS = {"CV": parse_cv_workbook, "PV": parse_pv_workbook, "DISCOUNT": parse_discount_sheet}
+
+
+# --- Single-Flight Loading ---
+# Concurrent callers asking for the same key share one call: the first runs
+# it, the rest block on its Future and receive the same result (or error).
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self._calls.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._calls.pop(key, None)
+        future.set_result(result)
+        return result
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+
+def file_fingerprint(path, info=None):
+    # A re-uploaded file under the same name gets a new key
+    info = info or os.stat(path)
+    return (os.path.abspath(path), info.st_ino, info.st_mtime_ns, info.st_size)
+
+
+# --- Memory Accounting ---
+# Deep size of a cached value: pandas and numpy report their own buffers
+# (object columns included), containers and plain objects are walked.
+# Objects reachable twice within one value are counted once.
+def deep_size(obj, seen=None):
+    seen = set() if seen is None else seen
+    if id(obj) in seen or isinstance(obj, (type, types.ModuleType, types.FunctionType, types.MethodType)):
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        size = obj.nbytes
+        if obj.dtype == object:
+            size += sum(deep_size(x, seen) for x in obj.flat)
+        return size
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_size(x, seen) for x in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_size(vars(obj), seen)
+    return size
+
+
+# --- Shared Cache ---
+# Process-wide, so every session (and the prewarmer) sees the same parsed
+# workbooks, keyed by file fingerprint. Artifacts derived from a workbook
+# (search indexes, diffs, ...) live in _derived and go with it on eviction.
+_cache = {}
+_derived = {}
+_lock = threading.Lock()
+_flight = SingleFlight()
+_stats = {"hits": 0, "parses": 0, "parse_errors": 0, "evictions": 0, "budget_evictions": 0}
+# Parses a session is waiting on; background work (prewarm, prefetch) marks
+# its thread and is not counted
+_foreground = {"parsing": 0}
+_background = threading.local()
+
+# --- Budget (GreedyDual-Size) ---
+# Every entry, workbook or derived, carries its deep size and the seconds it
+# took to build. Its priority is clock + cost / size, refreshed on each hit;
+# over budget, the lowest priority goes first and the clock advances to it.
+# Cheap-to-rebuild, large, long-unused entries are evicted before expensive
+# or recently used ones.
+_budget = {"bytes": CACHE_BUDGET_MB * 2**20, "used": 0, "clock": 0.0}
+_entries = {}  # key or dkey -> [size, cost, priority]
+_retain = {"books": True}
+
+
+def _priority(size, cost):
+    return _budget["clock"] + cost / max(size, 1)
+
+
+def _touch_locked(key):
+    entry = _entries.get(key)
+    if entry is not None:
+        entry[2] = _priority(entry[0], entry[1])
+
+
+def _forget_locked(key):
+    entry = _entries.pop(key, None)
+    if entry is not None:
+        _budget["used"] -= entry[0]
+
+
+def _admit_locked(key, size, cost):
+    _forget_locked(key)
+    _entries[key] = [size, cost, _priority(size, cost)]
+    _budget["used"] += size
+    _enforce_budget_locked(protect=key)
+
+
+def _enforce_budget_locked(protect=None):
+    while _budget["used"] > _budget["bytes"]:
+        victims = [(entry[2], key) for key, entry in _entries.items() if key != protect]
+        if not victims:
+            return
+        priority, victim = min(victims, key=lambda v: v[0])
+        _budget["clock"] = priority
+        if victim in _cache:
+            _drop_locked(victim)
+        else:
+            _derived.pop(victim, None)
+            _forget_locked(victim)
+        _stats["budget_evictions"] += 1
+
+
+def set_retain_books(retain):
+    # Off with the SQLite serving engine: rows come from the compiled
+    # databases, so a workbook is parsed only to build one of those or a
+    # derived artifact, and is not kept.
+    with _lock:
+        _retain["books"] = retain
+        if not retain:
+            for key in list(_cache):
+                _drop_locked(key)
+
+
+def set_budget(megabytes):
+    with _lock:
+        _budget["bytes"] = int(megabytes * 2**20)
+        _enforce_budget_locked()
+
+
+def _cached(key):
+    with _lock:
+        book = _cache.get(key)
+        if book is not None:
+            _stats["hits"] += 1
+            _touch_locked(key)
+        return book
+
+
+def _drop_locked(key):
+    del _cache[key]
+    _forget_locked(key)
+    for dkey in [d for d in _derived if key in d[0]]:
+        del _derived[dkey]
+        _forget_locked(dkey)
+    _stats["evictions"] += 1
+
+
+def _load(key, f, kind):
+    # Re-check: the previous leader may have finished after our cache miss
+    book = _cached(key)
+    if book is not None:
+        return book
+    foreground = not getattr(_background, "active", False)
+    started = time.perf_counter()
+    try:
+        if foreground:
+            with _lock:
+                _foreground["parsing"] += 1
+        book = PARSERS[kind](f)
+    except Exception:
+        with _lock:
+            _stats["parse_errors"] += 1
+        raise
+    finally:
+        if foreground:
+            with _lock:
+                _foreground["parsing"] -= 1
+    _store(key, book, time.perf_counter() - started)
+    return book
+
+
+def _store(key, book, cost):
+    size = deep_size(book) if _retain["books"] else 0
+    with _lock:
+        # An older version of the same file is unreachable from now on
+        for stale in [k for k in _cache if k[0] == key[0]]:
+            _drop_locked(stale)
+        _stats["parses"] += 1
+        if _retain["books"]:
+            _cache[key] = book
+            _admit_locked(key, size, cost)
+
+
+def open_workbook(path, kind):
+    # The open handle pins this reader to one immutable version of the file:
+    # the fingerprint and the parse both come from the same inode, even if
+    # an upload swaps a new file in under the same name meanwhile.
+    with open(path, "rb") as f:
+        key = file_fingerprint(path, os.fstat(f.fileno()))
+        book = _cached(key)
+        if book is None:
+            book = _flight.do(key, lambda: _load(key, f, kind))
+    return key, book
+
+
+def get_workbook(path, kind):
+    return open_workbook(path, kind)[1]
+
+
+def _build_derived(dkey, build, *books):
+    with _lock:
+        if dkey in _derived:
+            return _derived[dkey]
+    started = time.perf_counter()
+    value = build(*books)
+    cost = time.perf_counter() - started
+    size = deep_size(value)
+    with _lock:
+        if _retain["books"]:
+            # Don't resurrect an entry whose workbook was evicted meanwhile
+            if not all(key in _cache for key in dkey[0]):
+                return value
+        else:
+            # No workbook to take them along: older versions' artifacts go now
+            paths = {key[0]: key for key in dkey[0]}
+            for stale in [d for d in _derived if any(k[0] in paths and k != paths[k[0]] for k in d[0])]:
+                del _derived[stale]
+                _forget_locked(stale)
+        _derived[dkey] = value
+        _admit_locked(dkey, size, cost)
+    return value
+
+
+def _derived_hit(dkey):
+    with _lock:
+        if dkey in _derived:
+            _stats["hits"] += 1
+            _touch_locked(dkey)
+            return True, _derived[dkey]
+    return False, None
+
+
+def get_derived(sources, name, build):
+    # sources: [(path, kind), ...]; build(*books) runs once per combination
+    # of file versions and its result is shared like the workbooks are.
+    # An artifact already built for the current versions needs no workbook.
+    hit, value = _derived_hit((tuple(file_fingerprint(path) for path, _ in sources), name))
+    if hit:
+        return value
+    keys, books = zip(*(open_workbook(path, kind) for path, kind in sources))
+    dkey = (keys, name)
+    hit, value = _derived_hit(dkey)
+    if hit:
+        return value
+    return _flight.do(dkey, lambda: _build_derived(dkey, build, *books))
+
+
+def peek_derived(sources, name):
+    # -> (hit, value) for the current file versions; never opens a workbook
+    # or builds, so a view can render without waiting on either.
+    return _derived_hit((tuple(file_fingerprint(path) for path, _ in sources), name))
+
+
+def is_cached(path):
+    key = file_fingerprint(path)
+    with _lock:
+        return key in _cache
+
+
+def evict(path):
+    abspath = os.path.abspath(path)
+    with _lock:
+        stale = [k for k in _cache if k[0] == abspath]
+        for key in stale:
+            _drop_locked(key)
+    return len(stale)
+
+
+def cache_stats():
+    with _lock:
+        stats = dict(
+            _stats, entries=len(_cache), derived=len(_derived), bytes=_budget["used"], budget=_budget["bytes"]
+        )
+    stats["coalesced"] = _flight.coalesced
+    return stats
+
+
+# --- Startup Prewarm ---
+_prewarm_thread = None
+
+
+def _prewarm_queue():
+    queue = []
+    for kind, (data_dir, _) in CATALOGS.items():
+        for fname, fdate in list_recent_files(kind):
+            queue.append((fdate, os.path.join(data_dir, fname), kind))
+    # Newest file first, whichever product line it belongs to
+    queue.sort(key=lambda x: x[0], reverse=True)
+    return [(path, kind) for _, path, kind in queue]
+
+
+def _prewarm(warm):
+    _background.active = True
+    for path, kind in _prewarm_queue():
+        # Prewarming never evicts: stop once the budget is full
+        if _budget["used"] >= _budget["bytes"]:
+            return
+        try:
+            warm(path, kind)
+        except Exception:
+            # The session that selects this file will surface the error
+            continue
+
+
+def start_prewarm(warm=get_workbook):
+    # warm(path, kind) loads one retained file; default: parse it into the cache
+    global _prewarm_thread
+    with _lock:
+        if _prewarm_thread is not None:
+            return
+        _prewarm_thread = threading.Thread(target=_prewarm, args=(warm,), name="master-prewarm", daemon=True)
+    _prewarm_thread.start()
+
+
+# --- Speculative Prefetch ---
+# After a view has rendered, a page names the loads its user is likely to
+# want next. They run on one background thread, at most PREFETCH_MAX queued:
+# a session's new request replaces (cancels) what it still had queued, and
+# the oldest jobs beyond the bound are dropped. A job waits while any
+# session is waiting on a parse, and is skipped once the budget is full,
+# so prefetching never competes with foreground loads or evicts anything.
+PREFETCH_MAX = 8
+PREFETCH_IDLE_WAIT = 0.05
+
+
+class Prefetcher:
+    def __init__(self, max_jobs=PREFETCH_MAX):
+        self.max_jobs = max_jobs
+        self._cond = threading.Condition()
+        self._jobs = deque()  # (owner, key, fn), next job on the left
+        self._thread = None
+        self.stats = {"queued": 0, "done": 0, "cancelled": 0, "dropped": 0, "skipped": 0, "failed": 0}
+
+    def submit(self, owner, jobs):
+        # jobs: [(key, fn), ...] most likely first
+        with self._cond:
+            kept = deque(job for job in self._jobs if job[0] != owner)
+            self.stats["cancelled"] += len(self._jobs) - len(kept)
+            queued = {job[1] for job in kept}
+            new = [(owner, key, fn) for key, fn in jobs if key not in queued]
+            self._jobs = deque(new + list(kept))
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.pop()
+                self.stats["dropped"] += 1
+            self.stats["queued"] += len(new)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="master-prefetch", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def cancel(self, owner):
+        with self._cond:
+            kept = deque(job for job in self._jobs if job[0] != owner)
+            self.stats["cancelled"] += len(self._jobs) - len(kept)
+            self._jobs = kept
+
+    def pending(self):
+        with self._cond:
+            return len(self._jobs)
+
+    def _next(self):
+        with self._cond:
+            while True:
+                while not self._jobs:
+                    self._cond.wait()
+                with _lock:
+                    busy = _foreground["parsing"] > 0
+                if not busy:
+                    return self._jobs.popleft()
+                # Yield to sessions; a cancel or a newer request may land meanwhile
+                self._cond.wait(PREFETCH_IDLE_WAIT)
+
+    def _run(self):
+        _background.active = True
+        while True:
+            _, _, fn = self._next()
+            if _budget["used"] >= _budget["bytes"]:
+                self.stats["skipped"] += 1
+                continue
+            try:
+                fn()
+                self.stats["done"] += 1
+            except Exception:
+                # The session that opens this file will surface the error
+                self.stats["failed"] += 1
+
+
+prefetcher = Prefetcher()
+
+
+# --- Upload Ingest + Retention ---
+# An upload parses only the new file, from memory and before anything is
+# written: a file that doesn't parse never reaches DATA_DIR or the catalog.
+# Files that drop out of the newest-5 window are evicted from the cache and
+# deleted locally, mirroring the GitHub cleanup.
+_ingest_lock = threading.Lock()
+
+
+def prune_retention(kind):
+    data_dir, _ = CATALOGS[kind]
+    removed = []
+    for fname, _ in publish_catalog(kind)[KEEP_FILES:]:
+        path = os.path.join(data_dir, fname)
+        evict(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        removed.append(fname)
+    if removed:
+        publish_catalog(kind)
+    return removed
+
+
+def ingest_upload(kind, filename, content, on_ingest=None):
+    # on_ingest(path, book) runs once the file is in place, before retention
+    # may delete it again (an upload older than the newest KEEP_FILES)
+    data_dir, _ = CATALOGS[kind]
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, os.path.basename(filename))
+    with _ingest_lock:
+        started = time.perf_counter()
+        try:
+            book = PARSERS[kind](io.BytesIO(bytes(content)))
+        except Exception:
+            with _lock:
+                _stats["parse_errors"] += 1
+            raise
+        cost = time.perf_counter() - started
+        atomic_write(path, content)
+        _store(file_fingerprint(path), book, cost)
+        if on_ingest is not None:
+            on_ingest(path, book)
+        return path, prune_retention(kind)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+# PV model names carry a month tag ("3XO DIESEL_AUG25") that changes with
+# every file, so PV rows are aligned on Variant (unique within a sheet) and
+# Model is carried along as a label instead of being compared.
+CV_KEYS, CV_LABELS = ["Variant"], []
+PV_KEYS, PV_LABELS = ["Variant"], ["Model"]
+
+
+# === Frame diff ===
+# Both files are indexed on the key columns and aligned with one indexed
+# join; every shared column is then compared in a single array operation
+# instead of variant by variant.
+def diff_frames(old, new, keys, labels=()):
+    old = old.dropna(subset=keys).drop_duplicates(keys).set_index(keys)
+    new = new.dropna(subset=keys).drop_duplicates(keys).set_index(keys)
+
+    labels = [c for c in labels if c in new.columns and c in old.columns]
+    added = new.index.difference(old.index, sort=False)
+    removed = old.index.difference(new.index, sort=False)
+    common = new.index.intersection(old.index, sort=False)
+    columns = [
+        c for c in new.columns
+        if c in old.columns and c not in labels and not str(c).startswith("Unnamed")
+    ]
+
+    before = old.loc[common, columns]
+    after = new.loc[common, columns]
+    changed = (before.ne(after) & ~(before.isna() & after.isna())).to_numpy()
+    delta = (after.apply(pd.to_numeric, errors="coerce") - before.apply(pd.to_numeric, errors="coerce")).to_numpy()
+
+    # Long form: one row per (key, field) that changed
+    rows, cols = np.nonzero(changed)
+    changes = new.loc[common, labels].reset_index().iloc[rows].reset_index(drop=True)
+    changes["Field"] = np.asarray(columns, dtype=object)[cols]
+    changes["Old"] = before.to_numpy()[rows, cols]
+    changes["New"] = after.to_numpy()[rows, cols]
+    changes["Change"] = delta[rows, cols]
+
+    return {
+        "added": new.loc[added, labels].reset_index(),
+        "removed": old.loc[removed, labels].reset_index(),
+        "changes": changes,
+        "compared": len(common),
+    }
+
+
+def diff_cv(old_book, new_book):
+    return {"Sheet1": diff_frames(old_book["data"], new_book["data"], CV_KEYS, CV_LABELS)}
+
+
+def diff_pv(old_book, new_book):
+    # Only sheets both files have, with a Variant column to align on
+    sheets = [s for s in new_book if s in old_book and "Variant" in old_book[s] and "Variant" in new_book[s]]
+    return {s: diff_frames(old_book[s], new_book[s], PV_KEYS, PV_LABELS) for s in sheets}
+
+
+DIFFERS = {"CV": diff_cv, "PV": diff_pv}
@@ -0,0 +1,230 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# --- Currency Formatter ---
+def format_indian_currency(value):
+    try:
+        if pd.isnull(value) or value == 0:
+            return "₹0"
+        value = float(value)
+        is_negative = value < 0
+        value = abs(value)
+        s = f"{int(value)}"
+        last_three = s[-3:]
+        other = s[:-3]
+        if other:
+            other = re.sub(r'(\d)(?=(\d{2})+$)', r'\1,', other)
+            formatted = f"{other},{last_three}"
+        else:
+            formatted = last_three
+        result = f"₹{formatted}"
+        return f"-{result}" if is_negative else result
+    except:
+        return "Invalid"
+
+
+# --- Text Normalize ---
+def normalize_header_text(text):
+    if pd.isnull(text):
+        return ""
+    return " ".join(str(text).replace("\n", " ").split())
+
+
+# --- CV Pricing (Sheet1) ---
+# What the app, the PDF quotations and the price-book export all show for a
+# CV variant: MAXI CARE is not part of the quoted on-road totals.
+CV_PRICING_FIELDS = [
+    "Ex-Showroom Price", "TCS", "Comprehensive + Zero Dep. Insurance",
+    "R.T.O. Charges With Hypo.", "SMC Road - Tax (If Applicable)",
+    "RSA (Road Side Assistance) For 1 Year", "Accessories",
+    "ON ROAD PRICE With SMC Road Tax", "ON ROAD PRICE Without SMC Road Tax"
+]
+CV_ON_ROAD_FIELDS = ["ON ROAD PRICE With SMC Road Tax", "ON ROAD PRICE Without SMC Road Tax"]
+CARTEL_START_COL = 12  # Column M (0-based)
+
+# Derived columns, computed for every row when a file is parsed (cv_derived,
+# stored as book["derived"])
+CV_NET_ON_ROAD = {col: f"{col} (excl. MAXI CARE)" for col in CV_ON_ROAD_FIELDS}
+CV_BENEFIT_PREFIX = "Cartel Benefit: "
+CV_TOTAL_BENEFIT = "Total Cartel Benefit"
+CV_NET_PRICE = "Net Effective Price"
+CV_NET_PRICE_BASE = "ON ROAD PRICE With SMC Road Tax"
+# "JAN-2026 VIN 2026" / "JAN-2026 VIN 2025": one offer per manufacturing
+# year, so a vehicle gets only one of them
+CV_VIN_YEAR_GROUP = r"(?i)\bVIN\s*\d{4}\b"
+
+
+def cv_pricing(row):
+    # [(description, amount), ...]; the on-road prices come from the derived
+    # columns, which already have MAXI CARE taken out
+    return [(col, row[CV_NET_ON_ROAD.get(col, col)]) for col in CV_PRICING_FIELDS]
+
+
+def cv_cartel(header_row0, header_row1, data_row):
+    # [(group, [(description, offer), ...]), ...] from Sheet1's raw grid:
+    # groups are merged cells in row 0 (forward-filled), empty offers skipped
+    group_row = header_row0.iloc[CARTEL_START_COL:].ffill()
+    subheader_row = header_row1.iloc[CARTEL_START_COL:]
+    last_col = subheader_row.last_valid_index()
+
+    groups = []
+    current_group = None
+    group_has_rows = False
+    for col_idx in range(CARTEL_START_COL, last_col + 1):
+        grp = group_row.iloc[col_idx - CARTEL_START_COL]
+        sub = normalize_header_text(subheader_row.iloc[col_idx - CARTEL_START_COL])
+        val = data_row.iloc[col_idx]
+
+        if grp != current_group:
+            group_has_rows = False
+            current_group = grp
+
+        if pd.isnull(val) or val == 0 or str(val).strip() == "":
+            continue
+
+        if not group_has_rows:
+            groups.append((grp, []))
+            group_has_rows = True
+        groups[-1][1].append((sub, val))
+    return groups
+
+
+def cv_cartel_matrix(book):
+    # Every variant's cartel offers at once: one row per variant (first row
+    # wins, as in the single-variant view), columns (group, description) in
+    # sheet order. Empty offers are NaN; offers no variant gets are dropped.
+    raw = book["raw"]
+    subheader_row = raw.iloc[1, CARTEL_START_COL:]
+    last_col = subheader_row.last_valid_index()
+    variant_col = raw.iloc[1].tolist().index("Variant")
+    rows = raw.iloc[2:]
+    rows = rows[rows.iloc[:, variant_col].notna() & ~rows.iloc[:, variant_col].duplicated()]
+    if last_col is None:
+        return pd.DataFrame(index=pd.MultiIndex.from_arrays([[], []], names=["Model", "Variant"]))
+
+    grid = rows.iloc[:, CARTEL_START_COL:last_col + 1]
+    values = grid.to_numpy(dtype=object)
+    empty = pd.isna(values) | (values == 0) | (np.char.strip(values.astype(str)) == "")
+    groups = raw.iloc[0, CARTEL_START_COL:last_col + 1].ffill().fillna("")
+    matrix = pd.DataFrame(
+        np.where(empty, np.nan, values),
+        index=pd.MultiIndex.from_arrays(
+            [rows.iloc[:, 0].fillna("").astype(str), rows.iloc[:, variant_col].astype(str)], names=["Model", "Variant"]
+        ),
+        columns=pd.MultiIndex.from_arrays(
+            [groups.astype(str).to_numpy(), [normalize_header_text(sub) for sub in subheader_row.loc[:last_col]]],
+            names=["Group", "Description"],
+        ),
+    )
+    return matrix.loc[:, ~empty.all(axis=0)]
+
+
+def _cartel_amounts(raw):
+    # Sheet1's cartel block as floats (text offers and blanks -> NaN), with
+    # the forward-filled group and normalized description of each column
+    subheader_row = raw.iloc[1, CARTEL_START_COL:]
+    last_col = subheader_row.last_valid_index()
+    if last_col is None:
+        return np.empty((len(raw) - 2, 0)), [], []
+    values = raw.iloc[2:, CARTEL_START_COL:last_col + 1].to_numpy(dtype=object)
+    numeric = np.vectorize(lambda v: pd.api.types.is_number(v) and not isinstance(v, bool), otypes=[bool])(values)
+    amounts = np.where(numeric, values, np.nan).astype(float)
+    groups = raw.iloc[0, CARTEL_START_COL:last_col + 1].ffill().fillna("").astype(str).tolist()
+    subs = [normalize_header_text(sub) for sub in subheader_row.loc[:last_col]]
+    return amounts, groups, subs
+
+
+def _amounts(data, col):
+    # A text or missing amount is NaN in its own row, not an error for the file
+    if col not in data.columns:
+        return pd.Series(np.nan, index=data.index)
+    return pd.to_numeric(data[col], errors="coerce")
+
+
+def cv_total_benefit(frame, benefits):
+    # Sum of the given benefit columns; of the VIN-year groups only the
+    # largest counts
+    vin_years = [col for col in benefits if re.search(CV_VIN_YEAR_GROUP, col)]
+    total = frame[[col for col in benefits if col not in vin_years]].sum(axis=1)
+    if vin_years:
+        total = total + frame[vin_years].max(axis=1)
+    return total
+
+
+def cv_derived(book):
+    # Per-row columns for Sheet1 (same index as book["data"]):
+    # - on-road prices without MAXI CARE
+    # - cartel benefit per offer group: its "Total ..." column when the
+    #   group has one (the others are its parts), else the sum of its amounts
+    # - total benefit over all groups, counting only the largest of the
+    #   VIN-year groups, and the net price after it
+    data = book["data"]
+    maxi_care = _amounts(data, "MAXI CARE").fillna(0)
+    derived = pd.DataFrame(
+        {net: _amounts(data, col) - maxi_care for col, net in CV_NET_ON_ROAD.items()}, index=data.index
+    )
+
+    amounts, groups, subs = _cartel_amounts(book["raw"])
+    for group in dict.fromkeys(groups):
+        cols = [i for i, g in enumerate(groups) if g == group]
+        totals = [i for i in cols if subs[i].lower().startswith("total")]
+        derived[CV_BENEFIT_PREFIX + (group or "Cartel")] = np.nansum(amounts[:, totals or cols], axis=1)
+    benefits = [col for col in derived.columns if col.startswith(CV_BENEFIT_PREFIX)]
+    derived[CV_TOTAL_BENEFIT] = cv_total_benefit(derived, benefits)
+    derived[CV_NET_PRICE] = derived[CV_NET_ON_ROAD[CV_NET_PRICE_BASE]] - derived[CV_TOTAL_BENEFIT]
+    return derived
+
+
+def cv_net_ranking(book):
+    # One row per variant (first row wins): model, variant, on-road price
+    # without MAXI CARE, each group's benefit, the total and the net price
+    data, derived = book["data"], book["derived"]
+    benefits = [col for col in derived.columns if col.startswith(CV_BENEFIT_PREFIX)]
+    ranking = pd.concat([
+        pd.DataFrame({"Model": book["raw"].iloc[2:, 0].fillna("").astype(str).to_numpy(), "Variant": data["Variant"]},
+                     index=data.index),
+        derived[[CV_NET_ON_ROAD[CV_NET_PRICE_BASE]] + benefits + [CV_TOTAL_BENEFIT, CV_NET_PRICE]],
+    ], axis=1)
+    keep = data["Variant"].notna() & ~data["Variant"].duplicated()
+    return ranking[keep].reset_index(drop=True)
+
+
+# --- PV Pricing (PV / EV sheets) ---
+PV_SHARED_FIELDS = [
+    "Ex-Showroom Price", "TCS 1%", "Insurance 1 Yr OD + 3 Yr TP + Zero Dep.",
+    "Accessories Kit", "SMC", "Extended Warranty", "Maxi Care", "RSA (1 Year)", "Fastag"
+]
+PV_GROUP_KEYS = {
+    "RTO (W/O HYPO)": ("RTO (W/O HYPO) - Individual", "RTO (W/O HYPO) - Corporate"),
+    "RTO (With HYPO)": ("RTO (With HYPO) - Individual", "RTO (With HYPO) - Corporate"),
+    "On Road Price (W/O HYPO)": ("On Road Price (W/O HYPO) - Individual", "On Road Price (W/O HYPO) - Corporate"),
+    "On Road Price (With HYPO)": ("On Road Price (With HYPO) - Individual", "On Road Price (With HYPO) - Corporate"),
+}
+
+
+def pv_layout(available_columns):
+    # Shared fields and Individual/Corporate pairs present in this sheet
+    shared_fields = [f for f in PV_SHARED_FIELDS if f in available_columns]
+    group_keys = {
+        field: (ind_col, corp_col)
+        for field, (ind_col, corp_col) in PV_GROUP_KEYS.items()
+        if ind_col in available_columns and corp_col in available_columns
+    }
+    return shared_fields, group_keys
+
+
+def pv_pricing(row, shared_fields, group_keys):
+    # [(description, individual, corporate), ...]; shared fields without a
+    # usable amount are left out, paired fields always show
+    rows = []
+    for field in shared_fields:
+        val = row.get(field)
+        formatted = format_indian_currency(val)
+        if "N/A" not in formatted and "Invalid" not in formatted:
+            rows.append((field, val, val))
+    for field, (ind_key, corp_key) in group_keys.items():
+        rows.append((field, row.get(ind_key), row.get(corp_key)))
+    return rows
@@ -0,0 +1,209 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime
+
+import pandas as pd
+
+import master_cache
+
+DB_PATH = "Data/price_history.db"
+# Master files with prices (discount remark sheets have none)
+HISTORY_KINDS = ("CV", "PV")
+
+# --- Schema ---
+# Append-only: a master file is ingested once (by content hash) and its rows
+# are never updated. If a date is re-uploaded with new content, the newest
+# ingest for that date wins through the current_files view.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id     INTEGER PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    file_name   TEXT NOT NULL,
+    file_date   TEXT NOT NULL,
+    sha256      TEXT NOT NULL,
+    ingested_at TEXT NOT NULL,
+    UNIQUE (kind, sha256)
+);
+CREATE INDEX IF NOT EXISTS files_by_date ON files (kind, file_date, file_id);
+
+CREATE TABLE IF NOT EXISTS variants (
+    variant_id INTEGER PRIMARY KEY,
+    category   TEXT NOT NULL,
+    model      TEXT NOT NULL,
+    variant    TEXT NOT NULL,
+    UNIQUE (category, model, variant)
+);
+CREATE INDEX IF NOT EXISTS variants_by_name ON variants (category, variant);
+
+CREATE TABLE IF NOT EXISTS fields (
+    field_id INTEGER PRIMARY KEY,
+    name     TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS prices (
+    variant_id INTEGER NOT NULL REFERENCES variants,
+    field_id   INTEGER NOT NULL REFERENCES fields,
+    file_id    INTEGER NOT NULL REFERENCES files,
+    value      REAL,
+    text       TEXT,
+    PRIMARY KEY (variant_id, field_id, file_id)
+) WITHOUT ROWID;
+
+CREATE VIEW IF NOT EXISTS current_files AS
+SELECT f.* FROM files f
+WHERE f.file_id = (
+    SELECT MAX(g.file_id) FROM files g WHERE g.kind = f.kind AND g.file_date = f.file_date
+);
+"""
+
+_write_lock = threading.Lock()
+_initialized = set()
+
+
+def connect(db_path=DB_PATH):
+    if db_path not in _initialized:
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with closing(sqlite3.connect(db_path, timeout=30)) as conn:
+            # WAL lets history queries run while an upload is being ingested
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        _initialized.add(db_path)
+    return sqlite3.connect(db_path, timeout=30)
+
+
+# --- Row Extraction ---
+# PV model names carry a month tag ("3XO DIESEL_AUG25"); the base name keeps
+# one model's history under one key.
+def base_model(name):
+    return str(name).split("_")[0].strip()
+
+
+def _long_rows(category, frame, models):
+    ids = ["Variant"]
+    fields = [c for c in frame.columns if c not in ("Variant", "Model") and not str(c).startswith("Unnamed")]
+    frame = frame.assign(**{"_model": models}).dropna(subset=ids)
+    long = frame.melt(id_vars=["_model", "Variant"], value_vars=fields, var_name="field").dropna(subset=["value"])
+    numeric = pd.to_numeric(long["value"], errors="coerce")
+    for model, variant, field, raw, number in zip(
+        long["_model"], long["Variant"], long["field"], long["value"], numeric
+    ):
+        if pd.isnull(number):
+            yield category, model, str(variant), str(field), None, str(raw)
+        else:
+            yield category, model, str(variant), str(field), float(number), None
+
+
+def workbook_rows(kind, book):
+    if kind == "CV":
+        # Model Name is Sheet1's first column, dropped from the app's frame
+        models = book["raw"].iloc[2:, 0].fillna("").astype(str).map(base_model).to_numpy()
+        yield from _long_rows("CV", book["data"], models)
+    else:
+        for sheet, frame in book.items():
+            if "Variant" in frame.columns and "Model" in frame.columns:
+                yield from _long_rows(sheet, frame, frame["Model"].fillna("").map(base_model).to_numpy())
+
+
+# --- Ingest ---
+def record_file(kind, path, db_path=DB_PATH):
+    with open(path, "rb") as f:
+        content = f.read()
+    return _record(kind, os.path.basename(path), content, lambda: master_cache.get_workbook(path, kind), db_path)
+
+
+def record_upload(kind, file_name, content, book, db_path=DB_PATH):
+    # An upload already parsed by master_cache.ingest_upload: recorded from
+    # its bytes and book, so it doesn't matter if retention deletes the file
+    return _record(kind, file_name, content, lambda: book, db_path)
+
+
+def _record(kind, file_name, content, load_book, db_path):
+    _, pattern = master_cache.CATALOGS[kind]
+    file_date = master_cache.extract_date_from_filename(file_name, pattern)
+    if file_date is None:
+        return False
+    sha = hashlib.sha256(content).hexdigest()
+
+    with _write_lock, closing(connect(db_path)) as conn:
+        known = conn.execute("SELECT 1 FROM files WHERE kind = ? AND sha256 = ?", (kind, sha)).fetchone()
+        if known:
+            return False
+
+        book = load_book()
+        with conn:
+            file_id = conn.execute(
+                "INSERT INTO files (kind, file_name, file_date, sha256, ingested_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, file_name, file_date.strftime("%Y-%m-%d"), sha, datetime.now().isoformat(timespec="seconds")),
+            ).lastrowid
+            variant_ids, field_ids, rows = {}, {}, []
+            for category, model, variant, field, value, text in workbook_rows(kind, book):
+                vkey = (category, model, variant)
+                if vkey not in variant_ids:
+                    conn.execute("INSERT OR IGNORE INTO variants (category, model, variant) VALUES (?, ?, ?)", vkey)
+                    variant_ids[vkey] = conn.execute(
+                        "SELECT variant_id FROM variants WHERE category = ? AND model = ? AND variant = ?", vkey
+                    ).fetchone()[0]
+                if field not in field_ids:
+                    conn.execute("INSERT OR IGNORE INTO fields (name) VALUES (?)", (field,))
+                    field_ids[field] = conn.execute("SELECT field_id FROM fields WHERE name = ?", (field,)).fetchone()[0]
+                rows.append((variant_ids[vkey], field_ids[field], file_id, value, text))
+            conn.executemany(
+                "INSERT OR IGNORE INTO prices (variant_id, field_id, file_id, value, text) VALUES (?, ?, ?, ?, ?)", rows
+            )
+    return True
+
+
+def backfill(db_path=DB_PATH):
+    for kind in HISTORY_KINDS:
+        data_dir, _ = master_cache.CATALOGS[kind]
+        for fname, _ in master_cache.list_recent_files(kind):
+            try:
+                record_file(kind, os.path.join(data_dir, fname), db_path)
+            except Exception:
+                continue
+
+
+_backfill_thread = None
+
+
+def start_backfill():
+    # Once per process, in the background: records whatever retained files
+    # the store hasn't seen yet (e.g. after a redeploy with a fresh disk)
+    global _backfill_thread
+    with _write_lock:
+        if _backfill_thread is not None:
+            return
+        _backfill_thread = threading.Thread(target=backfill, name="price-history-backfill", daemon=True)
+    _backfill_thread.start()
+
+
+# --- Queries ---
+def variant_history(category, variant, model=None, field=None, since=None, db_path=DB_PATH):
+    # model: a base_model() name; without it, same-named variants of other
+    # models are included
+    sql = """
+        SELECT f.file_date AS "Date", v.model AS "Model", d.name AS "Field", p.value AS "Value", p.text AS "Text"
+        FROM variants v
+        JOIN prices p ON p.variant_id = v.variant_id
+        JOIN fields d ON d.field_id = p.field_id
+        JOIN current_files f ON f.file_id = p.file_id
+        WHERE v.category = ? AND v.variant = ?
+    """
+    params = [category, variant]
+    if model is not None:
+        sql += " AND v.model = ?"
+        params.append(model)
+    if field is not None:
+        sql += " AND d.name = ?"
+        params.append(field)
+    if since is not None:
+        sql += " AND f.file_date >= ?"
+        params.append(since.strftime("%Y-%m-%d"))
+    sql += " ORDER BY d.name, f.file_date"
+    with closing(connect(db_path)) as conn:
+        history = pd.read_sql_query(sql, conn, params=params)
+    history["Date"] = pd.to_datetime(history["Date"])
+    return history
@@ -0,0 +1,261 @@
+import io
+import math
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from xml.sax.saxutils import escape
+
+import pandas as pd
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+import master_cache
+import price_book
+import serving_backend
+
+WORKERS = min(4, os.cpu_count() or 1)
+# A TTF with the ₹ glyph; reportlab's built-in Helvetica has none
+FONT_CANDIDATES = [
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/dejavu/DejaVuSans.ttf", "/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf"),
+    ("C:/Windows/Fonts/arial.ttf", "C:/Windows/Fonts/arialbd.ttf"),
+]
+
+# Same palette as the app's tables
+TABLE_COLORS = {
+    "pricing": ("#004080", "#f0f4f8"),
+    "cartel": ("#2e7d32", "#e8f5e9"),
+    "points": ("#e65100", "#fff3e0"),
+}
+
+
+# --- Quotation Specs ---
+# Built in the app's process from the cached frames: plain strings only, so
+# they pickle cheaply to the render workers. One spec is one quotation.
+def _fmt(value):
+    return price_book.format_indian_currency(value) if pd.api.types.is_number(value) else str(value)
+
+
+def _cv_specs(book):
+    backend = serving_backend.FrameBackend("CV", book)
+    header_row0, header_row1 = backend.cartel_headers()
+    points = [(str(int(sr)), str(point)) for sr, point in zip(book["points"]["Sr."], book["points"]["Points"])]
+    specs = []
+    for variant in backend.variants("CV"):
+        row = backend.row("CV", variant)
+        sections = [("Vehicle Pricing Details", "pricing", ["Description", "Amount"],
+                     [(col, price_book.format_indian_currency(val)) for col, val in price_book.cv_pricing(row)])]
+        raw_row = backend.raw_row(variant)
+        if raw_row is not None:
+            for group, offers in price_book.cv_cartel(header_row0, header_row1, raw_row):
+                sections.append((f"Cartel Offer: {group}", "cartel", ["Description", "Offer"],
+                                 [(sub, _fmt(val)) for sub, val in offers]))
+        if points:
+            sections.append(("Important Points", "points", ["Sr.", "Points"], points))
+        specs.append({"title": str(variant), "sections": sections})
+    return specs
+
+
+def _pv_specs(book):
+    specs = []
+    for category, frame in book.items():
+        if "Variant" not in frame.columns or "Model" not in frame.columns:
+            continue
+        shared_fields, group_keys = price_book.pv_layout(frame.columns)
+        for _, row in frame.dropna(subset=["Variant"]).iterrows():
+            rows = [
+                (field, price_book.format_indian_currency(ind), price_book.format_indian_currency(corp))
+                for field, ind, corp in price_book.pv_pricing(row, shared_fields, group_keys)
+            ]
+            specs.append({
+                "title": f"{row['Model']} - {row['Variant']}",
+                "category": category,
+                "sections": [("Vehicle Pricing Details", "pricing", ["Description", "Individual", "Corporate"], rows)],
+            })
+    return specs
+
+
+SPEC_BUILDERS = {"CV": _cv_specs, "PV": _pv_specs}
+
+
+def _file_name(spec, used):
+    stem = re.sub(r"[^\w.-]+", "_", spec["title"]).strip("_") or "quotation"
+    if spec.get("category"):
+        stem = f"{spec['category']}/{stem}"
+    name, n = f"{stem}.pdf", 1
+    while name in used:
+        n += 1
+        name = f"{stem}_{n}.pdf"
+    used.add(name)
+    return name
+
+
+# --- Render Workers ---
+# Fonts and paragraph styles are set up once per worker process, not per page.
+_worker = {}
+
+
+def _init_worker():
+    regular, bold, rupee = "Helvetica", "Helvetica-Bold", False
+    for regular_path, bold_path in FONT_CANDIDATES:
+        if os.path.exists(regular_path) and os.path.exists(bold_path):
+            pdfmetrics.registerFont(TTFont("Quote", regular_path))
+            pdfmetrics.registerFont(TTFont("Quote-Bold", bold_path))
+            regular, bold, rupee = "Quote", "Quote-Bold", True
+            break
+    _worker.update(
+        rupee=rupee,
+        title=ParagraphStyle("title", fontName=bold, fontSize=16, leading=20, spaceAfter=4),
+        subtitle=ParagraphStyle("subtitle", fontName=regular, fontSize=9, leading=11, textColor=colors.grey, spaceAfter=8),
+        heading=ParagraphStyle("heading", fontName=bold, fontSize=12, leading=15, textColor=colors.HexColor("#e65100"),
+                               spaceBefore=8, spaceAfter=4),
+        cell=ParagraphStyle("cell", fontName=bold, fontSize=9, leading=11),
+        cell_right=ParagraphStyle("cell_right", fontName=bold, fontSize=9, leading=11, alignment=2),
+        header=ParagraphStyle("header", fontName=bold, fontSize=9, leading=11, textColor=colors.white),
+        header_right=ParagraphStyle("header_right", fontName=bold, fontSize=9, leading=11, textColor=colors.white,
+                                    alignment=2),
+        table_styles={
+            kind: TableStyle([
+                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor(head)),
+                ("BACKGROUND", (0, 1), (-1, -1), colors.HexColor(body)),
+                ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+                ("TOPPADDING", (0, 0), (-1, -1), 3),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
+            ])
+            for kind, (head, body) in TABLE_COLORS.items()
+        },
+    )
+
+
+def _text(value):
+    value = escape(value)
+    return value if _worker["rupee"] else value.replace("₹", "Rs. ")
+
+
+def _table(kind, columns, rows, width):
+    # Points: narrow Sr. column, wrapped text; amounts right-aligned
+    if kind == "points":
+        widths = [width * 0.1, width * 0.9]
+        aligned = ("cell", "cell")
+    else:
+        widths = [width * 0.6] + [width * 0.4 / (len(columns) - 1)] * (len(columns) - 1)
+        aligned = ("cell",) + ("cell_right",) * (len(columns) - 1)
+    header = [Paragraph(_text(c), _worker["header" if i == 0 or kind == "points" else "header_right"])
+              for i, c in enumerate(columns)]
+    body = [[Paragraph(_text(v), _worker[a]) for v, a in zip(row, aligned)] for row in rows]
+    table = Table([header] + body, colWidths=widths, repeatRows=1)
+    table.setStyle(_worker["table_styles"][kind])
+    return table
+
+
+def _story(spec, subtitle, width):
+    story = [Paragraph(_text(spec["title"]), _worker["title"]), Paragraph(_text(subtitle), _worker["subtitle"])]
+    for heading, kind, columns, rows in spec["sections"]:
+        if not rows:
+            continue
+        story.append(Paragraph(_text(heading), _worker["heading"]))
+        story.append(_table(kind, columns, rows, width))
+    story.append(Spacer(1, 6 * mm))
+    return story
+
+
+def _render(specs, subtitle):
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=15 * mm, rightMargin=15 * mm,
+                            topMargin=15 * mm, bottomMargin=15 * mm, pageCompression=1)
+    story = []
+    for i, spec in enumerate(specs):
+        if i:
+            story.append(PageBreak())
+        story.extend(_story(spec, subtitle, doc.width))
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def _render_batch(named_specs, subtitle):
+    return [(name, _render([spec], subtitle)) for name, spec in named_specs]
+
+
+# --- Worker Pool (one per server process, started on first export) ---
+# fork, not spawn/forkserver: those re-run __main__ in each worker, and under
+# Streamlit __main__ is the app script itself. Created on first use so a
+# server that never exports doesn't keep WORKERS idle copies of itself in
+# memory. After a worker dies the pool is dropped and the next export forks
+# a fresh one. Without fork (Windows) quotations render on a single
+# background thread instead.
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if "fork" in multiprocessing.get_all_start_methods():
+                _pool = ProcessPoolExecutor(
+                    max_workers=WORKERS, mp_context=multiprocessing.get_context("fork"), initializer=_init_worker
+                )
+            else:
+                _pool = ThreadPoolExecutor(max_workers=1, initializer=_init_worker)
+        return _pool
+
+
+def _reset_pool(broken):
+    # Only the pool that failed: another export may already have replaced it
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _zip_quotations(pool, specs, subtitle):
+    used = set()
+    named = [(_file_name(spec, used), spec) for spec in specs]
+    # A few batches per worker keeps pickling overhead low and the load even
+    size = max(1, math.ceil(len(named) / (WORKERS * 4)))
+    futures = [pool.submit(_render_batch, named[i:i + size], subtitle) for i in range(0, len(named), size)]
+    output = io.BytesIO()
+    # PDF pages are already compressed; store them as they arrive
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_STORED) as archive:
+        for future in as_completed(futures):
+            for name, pdf in future.result():
+                archive.writestr(name, pdf)
+    return output.getvalue()
+
+
+def _combined_quotation(pool, specs, subtitle):
+    # One document can't be laid out in pieces; it renders on one worker
+    return pool.submit(_render, specs, subtitle).result()
+
+
+def export_quotations(path, kind, combined=False):
+    # -> (download name, bytes, mime); cached per file version like the workbooks
+    stem = os.path.splitext(os.path.basename(path))[0]
+    subtitle = f"As per {stem}"
+
+    def build(book):
+        specs = SPEC_BUILDERS[kind](book)
+        pool = _get_pool()
+        try:
+            if combined:
+                return f"{stem} - Quotations.pdf", _combined_quotation(pool, specs, subtitle), "application/pdf"
+            return f"{stem} - Quotations.zip", _zip_quotations(pool, specs, subtitle), "application/zip"
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); the next export starts fresh
+            _reset_pool(pool)
+            raise
+
+    name = "quotations_pdf" if combined else "quotations_zip"
+    return master_cache.get_derived([(path, kind)], name, build)
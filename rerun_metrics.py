@@ -0,0 +1,247 @@
+import cProfile
+import functools
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import pandas as pd
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+HISTORY = 20
+PROFILE_DIR = "Data/.profiles"
+PROFILE_KEEP = 50
+PROFILE_TOP = 20
+
+
+# --- Payload Meter ---
+# Counts the serialized size of every ForwardMsg this session sends to the
+# browser, i.e. the websocket payload before compression. Hooked once per
+# session into its ScriptRunContext; if Streamlit internals change, metering
+# is simply skipped.
+def _meter():
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return None
+    try:
+        enqueue = ctx._enqueue
+        meter = getattr(enqueue, "payload_meter", None)
+        if meter is None:
+            meter = {"bytes": 0}
+
+            def counting_enqueue(msg):
+                meter["bytes"] += msg.ByteSize()
+                enqueue(msg)
+
+            counting_enqueue.payload_meter = meter
+            ctx._enqueue = counting_enqueue
+        return meter
+    except AttributeError:
+        return None
+
+
+def _snapshot():
+    meter = _meter()
+    return time.perf_counter(), meter, meter["bytes"] if meter else None
+
+
+def _record(scope, snapshot):
+    started, meter, start_bytes = snapshot
+    runs = st.session_state.setdefault("rerun_metrics", {}).setdefault(scope, deque(maxlen=HISTORY))
+    payload = meter["bytes"] - start_bytes if meter else None
+    finished = time.perf_counter()
+    runs.append(((finished - started) * 1000, payload, finished))
+
+
+def _is_fragment_rerun():
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+
+# --- Rerun Profiler (admin switch) ---
+# Armed per session for the next N reruns; when not armed the only cost is
+# one session_state lookup per run. One profiled run at a time per process
+# (cProfile hooks are per interpreter on newer Pythons); a run that never
+# reached its end (st.stop() early) is abandoned after PROFILE_TIMEOUT.
+PROFILE_TIMEOUT = 60
+_profile_lock = threading.Lock()
+_active_profile = {"owner": None, "since": 0.0}
+
+
+def _session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
+
+
+def _start_profile():
+    if st.session_state.get("profile_runs_left", 0) <= 0:
+        return
+    _stop_profile(st.session_state.pop("_profiler", None))
+    owner, now = _session_id(), time.monotonic()
+    with _profile_lock:
+        if _active_profile["owner"] not in (None, owner) and now - _active_profile["since"] < PROFILE_TIMEOUT:
+            return
+        _active_profile.update(owner=owner, since=now)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler (e.g. a debugger) is active in this interpreter
+        _release_profile(owner)
+        return
+    st.session_state["_profiler"] = (profiler, owner)
+
+
+def _release_profile(owner):
+    with _profile_lock:
+        if _active_profile["owner"] == owner:
+            _active_profile.update(owner=None, since=0.0)
+
+
+def _stop_profile(active):
+    if active is None:
+        return None
+    profiler, owner = active
+    profiler.disable()
+    _release_profile(owner)
+    return profiler
+
+
+def _top_functions(stats):
+    rows = []
+    for (filename, line, func), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append((f"{os.path.basename(filename)}:{line}({func})", calls, total * 1000, cumulative * 1000))
+    rows.sort(key=lambda r: r[3], reverse=True)
+    return pd.DataFrame(rows[:PROFILE_TOP], columns=["Function", "Calls", "Own ms", "Cumulative ms"])
+
+
+def _save_profile(profiler, scope):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    ctx = get_script_run_ctx()
+    script = os.path.splitext(os.path.basename(ctx.main_script_path))[0] if ctx else "app"
+    path = os.path.join(PROFILE_DIR, f"{script}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{scope}.prof")
+    profiler.dump_stats(path)
+    for old in sorted(f for f in os.listdir(PROFILE_DIR) if f.endswith(".prof"))[:-PROFILE_KEEP]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, old))
+        except FileNotFoundError:
+            pass
+    return path
+
+
+def _finish_profile(scope):
+    profiler = _stop_profile(st.session_state.pop("_profiler", None))
+    if profiler is None:
+        return False
+    st.session_state["profile_runs_left"] = max(0, st.session_state.get("profile_runs_left", 0) - 1)
+    stats = pstats.Stats(profiler)
+    st.session_state["last_profile"] = {
+        "scope": scope,
+        "path": _save_profile(profiler, scope),
+        "ms": stats.total_tt * 1000,
+        "top": _top_functions(stats),
+    }
+    return True
+
+
+def _render_last_profile():
+    profile = st.session_state.get("last_profile")
+    if profile is None:
+        return
+    left = st.session_state.get("profile_runs_left", 0)
+    with st.expander(f"🔬 Profile of last {profile['scope']} rerun: {profile['ms']:.0f} ms ({left} more to profile)"):
+        st.caption(f"Saved to {profile['path']}")
+        st.dataframe(profile["top"], hide_index=True)
+
+
+def render_profiler_controls():
+    # Admin sidebar: arm the profiler for the next N reruns
+    with st.sidebar.expander("🔬 Rerun Profiler", expanded=False):
+        runs = st.number_input("Reruns to profile", min_value=1, max_value=50, value=5, key="profile_runs")
+        if st.button("Profile next reruns", key="profile_start"):
+            st.session_state["profile_runs_left"] = int(runs)
+        if st.session_state.get("profile_runs_left", 0) > 0:
+            st.caption(f"Profiling: {st.session_state['profile_runs_left']} reruns left")
+            if st.button("Stop profiling", key="profile_stop"):
+                st.session_state["profile_runs_left"] = 0
+        if "last_profile" in st.session_state and st.button("Clear last profile", key="profile_clear"):
+            del st.session_state["last_profile"]
+
+
+# --- Run Tracking ---
+def begin_run():
+    # Top of the script: a full rerun starts here
+    st.session_state["_full_run_start"] = _snapshot()
+    _start_profile()
+
+
+def measured(fn):
+    # Wrap each fragment: a fragment rerun is timed (and profiled) on its
+    # own; in a full rerun it is just part of the run end_run() closes.
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _is_fragment_rerun():
+            return fn(*args, **kwargs)
+        snapshot = _snapshot()
+        _start_profile()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            _record("fragment", snapshot)
+            profiled = _finish_profile("fragment")
+        if profiled:
+            _render_last_profile()
+        return result
+
+    return wrapper
+
+
+def end_run():
+    # Bottom of the script: a full rerun ends here
+    snapshot = st.session_state.pop("_full_run_start", None)
+    if snapshot is not None:
+        _record("full", snapshot)
+    _finish_profile("full")
+    _render_last_profile()
+
+
+def summary():
+    stats = {}
+    for scope, runs in st.session_state.get("rerun_metrics", {}).items():
+        if not runs:
+            continue
+        payloads = [b for _, b, _ in runs if b is not None]
+        stats[scope] = {
+            "runs": len(runs),
+            "ms": sum(run[0] for run in runs) / len(runs),
+            "bytes": sum(payloads) / len(payloads) if payloads else None,
+        }
+    return stats
+
+
+def _kb(value):
+    return "n/a" if value is None else f"{value / 1024:.1f} KB"
+
+
+def render_sidebar_summary():
+    stats = summary()
+    if not stats:
+        return
+    lines = [
+        f"{scope.title()} rerun: {s['ms']:.0f} ms · {_kb(s['bytes'])} (avg of {s['runs']})"
+        for scope, s in stats.items()
+    ]
+    last_scope, last = max(
+        ((scope, runs[-1]) for scope, runs in st.session_state["rerun_metrics"].items() if runs),
+        key=lambda item: item[1][2],
+    )
+    lines.append(f"Last run ({last_scope}): {_kb(last[1])}")
+    full, frag = stats.get("full"), stats.get("fragment")
+    if full and frag:
+        saved = None if full["bytes"] is None or frag["bytes"] is None else full["bytes"] - frag["bytes"]
+        lines.append(f"Fragment saves {full['ms'] - frag['ms']:.0f} ms · {_kb(saved)} per change")
+    st.sidebar.caption("⏱️ " + "  \n".join(lines))
@@ -0,0 +1,307 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+import master_cache
+import price_book
+
+SERVING_DIR = "Data/.serving"
+# Bumped when compiled databases change shape (e.g. new derived columns)
+SERVING_VERSION = 3
+SERVED_KINDS = ("CV", "PV")
+
+
+# --- Pandas Backend ---
+# Lookups straight off the cached DataFrames (one copy per process).
+class FrameBackend:
+    def __init__(self, kind, book):
+        self.kind = kind
+        if kind == "CV":
+            frame = pd.concat([book["data"], book["derived"]], axis=1)
+            self.frames = {"CV": frame.assign(**{"_model": book["raw"].iloc[2:, 0].to_numpy()})}
+            self.raw = book["raw"]
+            self._points = book["points"]
+            self._variant_col = self.raw.iloc[1].tolist().index("Variant")
+        else:
+            self.frames = dict(book)
+            self._layouts = {category: price_book.pv_layout(frame.columns) for category, frame in book.items()}
+
+    def _model_col(self, category):
+        return "_model" if self.kind == "CV" else "Model"
+
+    def categories(self):
+        return list(self.frames)
+
+    def columns(self, category):
+        return [c for c in self.frames[category].columns if c != "_model"]
+
+    def layout(self, category):
+        # PV only: (shared fields, Individual/Corporate pairs) of this sheet
+        return self._layouts[category]
+
+    def models(self, category):
+        return self.frames[category][self._model_col(category)].dropna().drop_duplicates().tolist()
+
+    def variants(self, category, model=None):
+        df = self.frames[category]
+        if model is not None:
+            df = df[df[self._model_col(category)] == model]
+        return df["Variant"].dropna().drop_duplicates().tolist()
+
+    def row(self, category, variant, model=None):
+        df = self.frames[category]
+        mask = df["Variant"] == variant
+        if model is not None:
+            mask &= df[self._model_col(category)] == model
+        match = df[mask]
+        if match.empty:
+            return None
+        return match.iloc[0].drop("_model", errors="ignore")
+
+    # CV only: Sheet1's raw grid for the cartel table, Report points
+    def cartel_headers(self):
+        return self.raw.iloc[0], self.raw.iloc[1]
+
+    def raw_row(self, variant):
+        match = self.raw[self.raw.iloc[:, self._variant_col] == variant]
+        return None if match.empty else match.iloc[0]
+
+    def points(self):
+        return self._points
+
+
+# --- SQLite Backend ---
+# Each master file version is compiled once into a read-only database on
+# disk; every process then queries it through the OS page cache instead of
+# holding its own DataFrames. Covering indexes serve the dropdowns.
+SCHEMA = """
+CREATE TABLE rows (
+    category TEXT NOT NULL,
+    model    TEXT,
+    variant  TEXT,
+    ord      INTEGER NOT NULL,
+    payload  TEXT NOT NULL,
+    grid     TEXT
+);
+CREATE INDEX rows_by_model ON rows (category, model, variant, ord);
+CREATE INDEX rows_by_variant ON rows (category, variant, ord);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def _plain(value):
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if pd.isnull(value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _dumps(value):
+    return json.dumps(_plain(value), ensure_ascii=False)
+
+
+def _series(values, index):
+    return pd.Series([np.nan if v is None else v for v in values], index=index, dtype=object)
+
+
+def compile_workbook(kind, book, db_path):
+    tmp_path = f"{db_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        backend = FrameBackend(kind, book)
+        for category in backend.categories():
+            df = backend.frames[category]
+            columns = backend.columns(category)
+            models = df[backend._model_col(category)].tolist()
+            grid = backend.raw.iloc[2:].to_numpy().tolist() if kind == "CV" else None
+            records = (
+                (
+                    category,
+                    _plain(models[i]),
+                    _plain(variant),
+                    i,
+                    _dumps(values),
+                    _dumps(grid[i]) if grid is not None else None,
+                )
+                for i, (variant, values) in enumerate(zip(df["Variant"], df[columns].to_numpy().tolist()))
+            )
+            conn.executemany("INSERT INTO rows VALUES (?, ?, ?, ?, ?, ?)", records)
+            conn.execute("INSERT INTO meta VALUES (?, ?)", (f"columns:{category}", _dumps(columns)))
+        if kind == "CV":
+            group_row, subheader_row = backend.cartel_headers()
+            conn.execute("INSERT INTO meta VALUES ('cartel_headers', ?)", (_dumps([group_row.tolist(), subheader_row.tolist()]),))
+            conn.execute("INSERT INTO meta VALUES ('points', ?)", (_dumps(backend.points().to_numpy().tolist()),))
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+
+
+class SqliteBackend:
+    def __init__(self, kind, db_path):
+        self.kind = kind
+        self.db_path = db_path
+        self._inode = os.stat(db_path).st_ino
+        self._local = threading.local()
+        self._meta = dict(self._conn().execute("SELECT key, value FROM meta"))
+        if kind != "CV":
+            self._layouts = {category: price_book.pv_layout(self.columns(category)) for category in self.categories()}
+
+    def _conn(self):
+        # One read-only connection per thread (Streamlit runs sessions on many)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            uri = f"file:{os.path.abspath(self.db_path)}?mode=ro&immutable=1"
+            conn = self._local.conn = sqlite3.connect(uri, uri=True)
+        return conn
+
+    def is_current(self):
+        # False once any process removed (or recompiled) the database
+        try:
+            return os.stat(self.db_path).st_ino == self._inode
+        except FileNotFoundError:
+            return False
+
+    def categories(self):
+        return [k.split(":", 1)[1] for k in self._meta if k.startswith("columns:")]
+
+    def columns(self, category):
+        return json.loads(self._meta[f"columns:{category}"])
+
+    def layout(self, category):
+        return self._layouts[category]
+
+    def models(self, category):
+        rows = self._conn().execute(
+            "SELECT model FROM rows WHERE category = ? AND model IS NOT NULL GROUP BY model ORDER BY MIN(ord)",
+            (category,),
+        )
+        return [r[0] for r in rows]
+
+    def variants(self, category, model=None):
+        if model is None:
+            sql = "SELECT variant FROM rows WHERE category = ? AND variant IS NOT NULL GROUP BY variant ORDER BY MIN(ord)"
+            params = (category,)
+        else:
+            sql = (
+                "SELECT variant FROM rows WHERE category = ? AND model = ? AND variant IS NOT NULL "
+                "GROUP BY variant ORDER BY MIN(ord)"
+            )
+            params = (category, model)
+        return [r[0] for r in self._conn().execute(sql, params)]
+
+    def _first(self, column, category, variant, model=None):
+        sql = f"SELECT {column} FROM rows WHERE category = ? AND variant = ?"
+        params = [category, variant]
+        if model is not None:
+            sql += " AND model = ?"
+            params.append(model)
+        found = self._conn().execute(sql + " ORDER BY ord LIMIT 1", params).fetchone()
+        return None if found is None else json.loads(found[0])
+
+    def row(self, category, variant, model=None):
+        values = self._first("payload", category, variant, model)
+        return None if values is None else _series(values, self.columns(category))
+
+    def cartel_headers(self):
+        group_row, subheader_row = json.loads(self._meta["cartel_headers"])
+        return _series(group_row, range(len(group_row))), _series(subheader_row, range(len(subheader_row)))
+
+    def raw_row(self, variant):
+        values = self._first("grid", "CV", variant)
+        return None if values is None else _series(values, range(len(values)))
+
+    def points(self):
+        points = json.loads(self._meta["points"])
+        return pd.DataFrame(points, columns=["Sr.", "Points"])
+
+
+# --- Backend Selection ---
+_sqlite_backends = {}
+_sqlite_lock = threading.Lock()
+_compile_flight = master_cache.SingleFlight()
+
+
+def _db_path(key):
+    abspath = key[0]
+    digest = hashlib.sha1(repr((SERVING_VERSION,) + key[1:]).encode()).hexdigest()[:16]
+    return os.path.join(SERVING_DIR, f"{os.path.basename(abspath)}.{digest}.db")
+
+
+def _remove_stale_dbs(keep):
+    # Databases for older versions of this file, or for pruned files
+    for name in os.listdir(SERVING_DIR):
+        path = os.path.join(SERVING_DIR, name)
+        source = name.rsplit(".", 2)[0]
+        if path == keep or not name.endswith(".db"):
+            continue
+        same_file = os.path.basename(keep).rsplit(".", 2)[0] == source
+        gone = not any(os.path.exists(os.path.join(d, source)) for d, _ in master_cache.CATALOGS.values())
+        if same_file or gone:
+            with _sqlite_lock:
+                _sqlite_backends.pop(path, None)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def _open_sqlite(path, kind):
+    os.makedirs(SERVING_DIR, exist_ok=True)
+    db_path = _db_path(master_cache.file_fingerprint(path))
+    with _sqlite_lock:
+        backend = _sqlite_backends.get(db_path)
+    if backend is not None and backend.is_current():
+        return backend
+
+    def build():
+        if not os.path.exists(db_path):
+            key, book = master_cache.open_workbook(path, kind)
+            if _db_path(key) != db_path:
+                # Swapped while we looked; serve whichever version we parsed
+                return _open_sqlite(path, kind)
+            compile_workbook(kind, book, db_path)
+            _remove_stale_dbs(db_path)
+        backend = SqliteBackend(kind, db_path)
+        with _sqlite_lock:
+            # Forget databases another process has removed meanwhile
+            for stale in [p for p, b in _sqlite_backends.items() if not b.is_current()]:
+                del _sqlite_backends[stale]
+            _sqlite_backends[db_path] = backend
+        return backend
+
+    return _compile_flight.do(db_path, build)
+
+
+def _prewarm_sqlite(path, kind):
+    if kind in SERVED_KINDS:
+        _open_sqlite(path, kind)
+
+
+def start_prewarm(engine="pandas"):
+    # With SQLite, prewarm compiles (or opens) the databases instead of
+    # keeping every parsed workbook in this process
+    if engine == "sqlite":
+        master_cache.set_retain_books(False)
+        master_cache.start_prewarm(_prewarm_sqlite)
+    else:
+        master_cache.start_prewarm()
+
+
+def get_backend(path, kind, engine="pandas"):
+    if engine == "sqlite":
+        return _open_sqlite(path, kind)
+    return master_cache.get_derived([(path, kind)], "frame_backend", lambda book: FrameBackend(kind, book))
@@ -2,6 +2,14 @@ import streamlit as st
 import pandas as pd
 import re
 import io
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+import master_cache
 
 # === Normalize helper ===
 def normalize(text):
@@ -63,6 +71,76 @@ def parse_discount_model(entry):
         "rule_type": rule_type
     }
 
+# === Persistent parsed-rule cache ===
+# Remarks mostly carry over from one month's sheet to the next, so parsed
+# rules are kept on disk keyed by a hash of the remark and PARSER_VERSION.
+# Bump the version whenever parse_discount_model's output changes: old
+# entries then stop matching and age out of the LRU.
+PARSER_VERSION = 1
+RULE_CACHE_PATH = "Data/.rule_cache.json"
+RULE_CACHE_SIZE = 20000
+
+class ParsedRuleCache:
+    def __init__(self, path=RULE_CACHE_PATH, max_entries=RULE_CACHE_SIZE):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = None  # loaded on first use
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(remark):
+        return hashlib.sha1(f"{PARSER_VERSION}\n{remark}".encode()).hexdigest()
+
+    def _load_locked(self):
+        if self._entries is not None:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            entries = []
+        # Stored least recently used first
+        self._entries = OrderedDict((key, rule) for key, rule in entries)
+
+    def _save_locked(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        content = json.dumps(list(self._entries.items()), ensure_ascii=False)
+        master_cache.atomic_write(self.path, content.encode("utf-8"))
+
+    def parse_many(self, remarks):
+        # -> [parse_discount_model(remark), ...]; only unseen remarks are parsed
+        results = []
+        with self._lock:
+            self._load_locked()
+            changed = False
+            for remark in remarks:
+                if not isinstance(remark, str):
+                    results.append(None)
+                    continue
+                key = self.key(remark)
+                rule = self._entries.get(key)
+                if rule is None:
+                    self.misses += 1
+                    rule = parse_discount_model(remark)
+                    self._entries[key] = rule
+                    changed = True
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                results.append(dict(rule, variants=list(rule["variants"])))
+            if changed:
+                self._save_locked()
+        return results
+
+_rule_cache = ParsedRuleCache()
+
+def parse_remarks(remarks):
+    return _rule_cache.parse_many(remarks)
+
 # === Rule engine for matching ===
 def is_match(row, parsed):
     model = normalize_model(row["Model"])
@@ -104,3 +182,146 @@ def is_match(row, parsed):
         return all(term not in variant for term in terms)
 
     return False
+
+
+# === Rule overlap analysis (bitsets) ===
+# A rule's match set is an int with bit i set when catalog row i matches
+# (same semantics as is_match). Catalog columns are normalized once and
+# predicates are evaluated per distinct model / fuel / term, so overlaps and
+# coverage counts reduce to bitwise AND/OR over whole catalogs at a time.
+def mask_to_bits(mask):
+    return int.from_bytes(np.packbits(np.asarray(mask, dtype=bool), bitorder="little").tobytes(), "little")
+
+def bits_to_mask(bits, size):
+    raw = np.frombuffer(bits.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(raw, bitorder="little")[:size].astype(bool)
+
+class CatalogBits:
+    def __init__(self, catalog):
+        # catalog: rows with Model, Fuel Type, Variant (e.g. a price list)
+        self.size = len(catalog)
+        self.all = (1 << self.size) - 1
+        models = catalog["Model"].fillna("").astype(str).map(normalize_model)
+        fuels = catalog["Fuel Type"].map(normalize)
+        self.variants = catalog["Variant"].map(normalize)
+        self.model_rows = {m: mask_to_bits(models.to_numpy() == m) for m in models.unique()}
+        self.fuel_rows = {f: mask_to_bits(fuels.to_numpy() == f) for f in fuels.unique()}
+        self._model_cache = {}
+        self._term_cache = {}
+
+    def model_bits(self, p_model, exact):
+        key = (p_model, exact)
+        if key not in self._model_cache:
+            bits = 0
+            for model, rows in self.model_rows.items():
+                if exact:
+                    hit = p_model == model
+                else:
+                    hit = p_model in model or model in p_model or model.endswith(p_model) or p_model.endswith(model)
+                if hit:
+                    bits |= rows
+            self._model_cache[key] = bits
+        return self._model_cache[key]
+
+    def fuel_bits(self, p_fuel):
+        return self.fuel_rows.get(p_fuel.upper(), 0) if p_fuel else self.all
+
+    def term_bits(self, term, prefix=False):
+        key = (term, prefix)
+        if key not in self._term_cache:
+            if prefix:
+                mask = self.variants.str.startswith(term)
+            else:
+                mask = self.variants.str.contains(term, regex=False)
+            self._term_cache[key] = mask_to_bits(mask.to_numpy())
+        return self._term_cache[key]
+
+    def rule_bits(self, parsed):
+        rule = parsed["rule_type"]
+        terms = parsed["variants"]
+        bits = self.model_bits(parsed["model"], rule == "exact_model_all") & self.fuel_bits(parsed["fuel"])
+        if rule == "all":
+            return bits
+        if rule == "include_any":
+            any_bits = 0
+            for term in terms:
+                any_bits |= self.term_bits(term)
+            return bits & any_bits
+        if rule == "include_all":
+            for term in terms:
+                bits &= self.term_bits(term)
+            return bits
+        if rule == "prefix_include":
+            any_bits = 0
+            for term in terms:
+                any_bits |= self.term_bits(term, prefix=True)
+            return bits & any_bits
+        if rule == "all_except":
+            for term in terms:
+                bits &= ~self.term_bits(term)
+            return bits
+        # is_match matches nothing else (including exact_model_all)
+        return 0
+
+def first_rows(bits, n):
+    rows = []
+    while bits and len(rows) < n:
+        low = bits & -bits
+        rows.append(low.bit_length() - 1)
+        bits ^= low
+    return rows
+
+def count_planes(rule_bits):
+    # Bit-sliced counter: plane k holds bit k of each row's rule count
+    planes = []
+    for bits in rule_bits:
+        carry = bits
+        for k, plane in enumerate(planes):
+            planes[k], carry = plane ^ carry, plane & carry
+            if not carry:
+                break
+        if carry:
+            planes.append(carry)
+    return planes
+
+def analyze_rule_overlaps(catalog, remarks, sample=5):
+    # -> {"rules", "conflicts", "counts", "uncovered"} DataFrames
+    catalog = catalog.reset_index(drop=True)
+    index = CatalogBits(catalog)
+    parsed = [(remark, rule) for remark, rule in zip(remarks, parse_remarks(remarks)) if rule is not None]
+    rule_bits = [index.rule_bits(rule) for _, rule in parsed]
+
+    rules = pd.DataFrame({
+        "Rule": [rule["original"] for _, rule in parsed],
+        "Type": [rule["rule_type"] for _, rule in parsed],
+        "Matches": [bits.bit_count() for bits in rule_bits],
+    })
+
+    # Pairwise intersections, only among rules that match anything
+    variant_names = catalog["Variant"].astype(str).to_numpy()
+    live = [i for i, bits in enumerate(rule_bits) if bits]
+    conflicts = []
+    for a_pos, i in enumerate(live):
+        bits_i = rule_bits[i]
+        for j in live[a_pos + 1:]:
+            overlap = bits_i & rule_bits[j]
+            if overlap:
+                conflicts.append({
+                    "Rule A": parsed[i][1]["original"],
+                    "Rule B": parsed[j][1]["original"],
+                    "Variants": overlap.bit_count(),
+                    "Examples": ", ".join(variant_names[first_rows(overlap, sample)]),
+                })
+    conflicts = pd.DataFrame(conflicts, columns=["Rule A", "Rule B", "Variants", "Examples"])
+
+    counts = np.zeros(index.size, dtype=np.int64)
+    for k, plane in enumerate(count_planes(rule_bits)):
+        counts += bits_to_mask(plane, index.size).astype(np.int64) << k
+    counts = catalog[["Model", "Fuel Type", "Variant"]].assign(Rules=counts)
+
+    return {
+        "rules": rules,
+        "conflicts": conflicts,
+        "counts": counts,
+        "uncovered": counts[counts["Rules"] == 0].drop(columns="Rules"),
+    }
@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import github_sync  # noqa: E402
+import master_cache  # noqa: E402
+
+DATA_DIR, _ = master_cache.CATALOGS["PV"]
+PREFIX = f"/repos/o/r/contents/{DATA_DIR}"
+
+
+def pv_name(day):
+    return f"PV Price List Master D. {day:02d}.09.2025.xlsx"
+
+
+# --- Local Stand-In for the GitHub Contents API ---
+# Lists self.server.files (name -> bytes) with an ETag over the listing and
+# serves each file's raw bytes; every request is counted by kind.
+class ContentsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = unquote(urlsplit(self.path).path)
+        files, hits = self.server.files, self.server.hits
+        if path == PREFIX:
+            listing = [{"name": name, "type": "file", "sha": github_sync.git_blob_sha(content)}
+                       for name, content in sorted(files.items())]
+            body = json.dumps(listing).encode()
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                hits["304"] += 1
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            hits["list"] += 1
+            self.send_response(200)
+            self.send_header("ETag", etag)
+        elif path.startswith(PREFIX + "/") and path[len(PREFIX) + 1:] in files:
+            hits["raw"] += 1
+            body = files[path[len(PREFIX) + 1:]]
+            self.send_response(200)
+        else:
+            body = b'{"message": "Not Found"}'
+            self.send_response(404)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class GitHubSyncTest(unittest.TestCase):
+    def setUp(self):
+        # CATALOGS paths are relative: each test syncs into its own directory
+        self.cwd = os.getcwd()
+        self.work = tempfile.mkdtemp()
+        os.chdir(self.work)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ContentsHandler)
+        self.server.files = {pv_name(1): b"first", pv_name(2): b"second"}
+        self.server.hits = {"list": 0, "304": 0, "raw": 0}
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.updates = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.work, ignore_errors=True)
+
+    def syncer(self, on_update=None):
+        return github_sync.GitHubSync(
+            "o", "r", api_url=f"http://127.0.0.1:{self.server.server_port}", kinds=["PV"],
+            on_update=on_update or (lambda kind, path: self.updates.append((kind, os.path.basename(path)))),
+        )
+
+    def local(self, name):
+        with open(os.path.join(DATA_DIR, name), "rb") as f:
+            return f.read()
+
+    def test_first_pass_downloads_every_file(self):
+        syncer = self.syncer()
+        written = asyncio.run(syncer.sync_once())
+        self.assertEqual(sorted(os.path.basename(p) for p in written["PV"]), [pv_name(1), pv_name(2)])
+        self.assertEqual(self.local(pv_name(1)), b"first")
+        self.assertEqual(self.local(pv_name(2)), b"second")
+        self.assertEqual(self.server.hits, {"list": 1, "304": 0, "raw": 2})
+        self.assertEqual(sorted(self.updates), [("PV", pv_name(1)), ("PV", pv_name(2))])
+        self.assertEqual(syncer.stats["errors"], 0)
+
+    def test_unchanged_listing_is_a_304(self):
+        syncer = self.syncer()
+        asyncio.run(syncer.sync_once())
+        self.assertEqual(asyncio.run(syncer.sync_once()), {})
+        self.assertEqual(self.server.hits, {"list": 1, "304": 1, "raw": 2})
+        self.assertEqual(syncer.stats["not_modified"], 1)
+
+    def test_only_new_and_changed_files_are_downloaded(self):
+        syncer = self.syncer()
+        asyncio.run(syncer.sync_once())
+        self.updates.clear()
+        self.server.files[pv_name(2)] = b"second, revised"
+        self.server.files[pv_name(3)] = b"third"
+        written = asyncio.run(syncer.sync_once())
+        self.assertEqual(sorted(os.path.basename(p) for p in written["PV"]), [pv_name(2), pv_name(3)])
+        self.assertEqual(self.server.hits, {"list": 2, "304": 0, "raw": 4})
+        self.assertEqual(self.local(pv_name(2)), b"second, revised")
+        self.assertEqual(self.local(pv_name(3)), b"third")
+        self.assertEqual(sorted(self.updates), [("PV", pv_name(2)), ("PV", pv_name(3))])
+        self.assertEqual([name for name, _ in master_cache.list_dated_files("PV")],
+                         [pv_name(3), pv_name(2), pv_name(1)])
+
+    def test_failing_on_update_is_recorded(self):
+        def on_update(kind, path):
+            self.updates.append(os.path.basename(path))
+            if path.endswith(pv_name(1)):
+                raise RuntimeError("history database locked")
+
+        syncer = self.syncer(on_update)
+        written = asyncio.run(syncer.sync_once())
+        self.assertEqual(len(written["PV"]), 2)
+        self.assertEqual(sorted(self.updates), [pv_name(1), pv_name(2)])
+        self.assertEqual(syncer.stats["errors"], 1)
+        self.assertIn("history database locked", syncer.stats["last_error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
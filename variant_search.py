@@ -0,0 +1,75 @@
+import re
+from collections import defaultdict
+
+
+# === Normalize helper ===
+def normalize_search_text(text):
+    if not isinstance(text, str):
+        return ""
+    return " ".join(re.sub(r"[^0-9A-Z]+", " ", text.upper()).split())
+
+
+# Each word is padded like "  WORD " so a leading match scores higher
+def trigrams(text):
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+# === Trigram index ===
+# Postings map each trigram to the ids of the names containing it, so a
+# query only touches the names that share at least one trigram with it.
+class TrigramIndex:
+    def __init__(self, entries):
+        # entries: [(key, searchable text), ...]; duplicates keep the first
+        self.keys, self.texts = [], []
+        self.postings = defaultdict(list)
+        seen = set()
+        for key, text in entries:
+            if key in seen:
+                continue
+            seen.add(key)
+            doc = len(self.keys)
+            self.keys.append(key)
+            self.texts.append(normalize_search_text(text))
+            for gram in trigrams(self.texts[doc]):
+                self.postings[gram].append(doc)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def search(self, query, limit=20):
+        query = normalize_search_text(query)
+        if not query:
+            return []
+
+        grams = trigrams(query)
+        hits = defaultdict(int)
+        for gram in grams:
+            for doc in self.postings.get(gram, ()):
+                hits[doc] += 1
+
+        # At least half of the query's trigrams must match (tolerates typos);
+        # an exact substring always qualifies and ranks first.
+        needed = max(1, len(grams) // 2)
+        ranked = []
+        for doc, count in hits.items():
+            contains = query in self.texts[doc]
+            if count >= needed or contains:
+                score = count / len(grams) + (1.0 if contains else 0.0)
+                ranked.append((-score, len(self.texts[doc]), doc))
+        ranked.sort()
+        return [(self.keys[doc], -score) for score, _, doc in ranked[:limit]]
+
+
+# === Builders ===
+def build_cv_index(workbook):
+    # The app drops Sheet1's first column (Model Name); take it from the raw grid
+    data = workbook["data"]
+    models = workbook["raw"].iloc[2:, 0].fillna("").astype(str).to_numpy()
+    rows = data.assign(model=models)[["Variant", "model"]].dropna(subset=["Variant"])
+    return TrigramIndex(
+        (variant, f"{variant} {model}") for variant, model in zip(rows["Variant"], rows["model"])
+    )
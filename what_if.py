@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+import master_cache
+import price_book
+
+# On-road price = every shared field + the RTO of that buyer/HYPO column
+# (holds for every row of the PV and EV sheets)
+BUYERS = ["Individual", "Corporate"]
+ON_ROAD_COLUMNS = [
+    (buyer, hypo, f"RTO ({hypo}) - {buyer}", f"On Road Price ({hypo}) - {buyer}")
+    for buyer in BUYERS
+    for hypo in ["W/O HYPO", "With HYPO"]
+]
+EX_SHOWROOM = "Ex-Showroom Price"
+TCS_FIELD = "TCS 1%"
+INSURANCE_FIELD = "Insurance 1 Yr OD + 3 Yr TP + Zero Dep."
+# Current rule: 1% TCS on cars above ₹10 lakh ex-showroom
+TCS_RATE = 1.0
+TCS_THRESHOLD = 1000000
+
+
+# --- Catalog Arrays (built once per price list version) ---
+# PV and EV stacked into one set of float arrays; fields a sheet lacks are
+# 0 and masked out, so overrides never add them to that sheet's prices.
+def build_catalog(book):
+    keys, fields, present, rto, on_road = [], {}, {}, [], []
+    for category, frame in book.items():
+        if "Variant" not in frame.columns or "Model" not in frame.columns:
+            continue
+        if not all(col in frame.columns for _, _, rto_col, road_col in ON_ROAD_COLUMNS for col in (rto_col, road_col)):
+            continue
+        rows = frame.dropna(subset=["Variant"])
+        keys.append(pd.DataFrame({"Category": category, "Model": rows["Model"].to_numpy(), "Variant": rows["Variant"].to_numpy()}))
+        for field in price_book.PV_SHARED_FIELDS:
+            values = rows[field] if field in rows.columns else pd.Series(0.0, index=rows.index)
+            fields.setdefault(field, []).append(pd.to_numeric(values, errors="coerce").fillna(0).to_numpy(float))
+            present.setdefault(field, []).append(np.full(len(rows), field in rows.columns))
+        rto.append(rows[[c for _, _, c, _ in ON_ROAD_COLUMNS]].apply(pd.to_numeric, errors="coerce").to_numpy(float))
+        on_road.append(rows[[c for _, _, _, c in ON_ROAD_COLUMNS]].apply(pd.to_numeric, errors="coerce").to_numpy(float))
+    if not keys:
+        return None
+    rto = np.concatenate(rto)
+    return {
+        "keys": pd.concat(keys, ignore_index=True),
+        "fields": {field: np.concatenate(parts) for field, parts in fields.items()},
+        "present": {field: np.concatenate(parts) for field, parts in present.items()},
+        "rto": rto,
+        "on_road": np.concatenate(on_road),
+        # HYPO charge per row and buyer: RTO with HYPO minus RTO without
+        "hypo_fee": np.stack([rto[:, 2 * b + 1] - rto[:, 2 * b] for b in range(len(BUYERS))], axis=1),
+    }
+
+
+def catalog(path):
+    return master_cache.get_derived([(path, "PV")], "what_if_catalog", build_catalog)
+
+
+def current_amount(cat, field):
+    # Most common amount in the file, as the starting value of an override
+    values = cat["fields"][field][cat["present"][field]]
+    return float(pd.Series(values).mode().iloc[0]) if len(values) else 0.0
+
+
+def current_hypo_fee(cat):
+    fees = cat["hypo_fee"].ravel()
+    fees = fees[~np.isnan(fees)]
+    return float(pd.Series(fees).mode().iloc[0]) if len(fees) else 0.0
+
+
+# --- Scenario (one vectorized pass over the whole catalog) ---
+def apply(cat, tcs_rate=TCS_RATE, tcs_threshold=TCS_THRESHOLD, insurance_pct=0.0, rto_pct=None, hypo_fee=None,
+          amounts=None):
+    # -> (new on-road prices, change) as (rows x ON_ROAD_COLUMNS) arrays.
+    # Only what a scenario changes moves a price, so an unchanged scenario
+    # gives the file's own prices back exactly.
+    fields, present = cat["fields"], cat["present"]
+    shared_delta = np.zeros(len(cat["keys"]))
+
+    if (tcs_rate, tcs_threshold) != (TCS_RATE, TCS_THRESHOLD):
+        ex_showroom = fields[EX_SHOWROOM]
+        tcs = np.where(ex_showroom > tcs_threshold, np.round(ex_showroom * tcs_rate / 100), 0)
+        shared_delta += np.where(present[TCS_FIELD], tcs - fields[TCS_FIELD], 0)
+    if insurance_pct:
+        shared_delta += np.round(fields[INSURANCE_FIELD] * insurance_pct / 100)
+    for field, amount in (amounts or {}).items():
+        shared_delta += np.where(present[field], amount - fields[field], 0)
+
+    # An RTO rate change scales the RTO without HYPO; the HYPO column moves
+    # with it, plus any change of the HYPO charge itself
+    rto_delta = np.zeros_like(cat["rto"])
+    for i, (buyer, hypo, _, _) in enumerate(ON_ROAD_COLUMNS):
+        b = BUYERS.index(buyer)
+        pct = (rto_pct or {}).get(buyer, 0.0)
+        if pct:
+            rto_delta[:, i] = np.round(cat["rto"][:, 2 * b] * pct / 100)
+        if hypo == "With HYPO" and hypo_fee is not None:
+            rto_delta[:, i] += hypo_fee - cat["hypo_fee"][:, b]
+
+    change = shared_delta[:, None] + rto_delta
+    return cat["on_road"] + change, change